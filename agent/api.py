@@ -2,22 +2,31 @@
 
 from __future__ import annotations
 
-import json
+import asyncio
+import hashlib
 import logging
+import os
+import re
+import secrets
+from collections import deque
+from contextlib import asynccontextmanager, suppress
 from datetime import datetime, timezone
-from time import perf_counter
-from typing import Any
-from uuid import uuid4
+from functools import lru_cache
+from itertools import islice
+from time import perf_counter_ns, time_ns
+from typing import Any, AsyncIterator, Iterator, Literal, Sequence
 
-from fastapi import Depends, FastAPI, Header, Query
+from fastapi import FastAPI, Header, Query
 from fastapi.concurrency import run_in_threadpool
 from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, Response, StreamingResponse
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+import orjson
 from pydantic import BaseModel, Field
+from starlette.types import ASGIApp, Receive, Scope, Send
 
 try:  # pragma: no cover - supports script execution
-    from .graph import astream_workflow, get_graph_schema, run_workflow
+    from .graph import STREAM_MODES, arun_workflow, astream_workflow, get_graph_schema
     from .llm_factory import DEFAULT_GROQ_MODEL, PROVIDER_NAME, build_chat_model
     from .prompts import (
         MAX_MUTABLE_PROMPT_CHARS,
@@ -29,7 +38,7 @@ try:  # pragma: no cover - supports script execution
     from .security_config import SecurityConfig, load_security_config
     from . import workspace as workspace_service
 except ImportError:  # pragma: no cover
-    from graph import astream_workflow, get_graph_schema, run_workflow
+    from graph import STREAM_MODES, arun_workflow, astream_workflow, get_graph_schema
     from llm_factory import DEFAULT_GROQ_MODEL, PROVIDER_NAME, build_chat_model
     from prompts import (
         MAX_MUTABLE_PROMPT_CHARS,
@@ -43,10 +52,8 @@ except ImportError:  # pragma: no cover
 
 logger = logging.getLogger(__name__)
 SECURITY_CONFIG: SecurityConfig = load_security_config()
-
-
-class WorkspaceAuthRequiredError(PermissionError):
-    """Raised when workspace APIs require an API key and one is not provided."""
+SESSION_CLEANUP_INTERVAL_SECONDS = 30
+STREAM_INCLUDE_RAW = os.getenv("AGENT_STREAM_INCLUDE_RAW", "").strip() == "1"
 
 
 class ApiErrorBody(BaseModel):
@@ -122,11 +129,16 @@ class WorkspaceSessionResponse(BaseModel):
 
 
 NODE_IDS = ("planner", "architect", "coder")
-NODE_PHASES: dict[str, str] = {
-    "planner": "planning",
-    "architect": "architecture",
-    "coder": "coding",
-}
+NODE_PHASE_BY_INDEX = ("planning", "architecture", "coding")
+NODE_INDEX: dict[str, int] = {node_id: index for index, node_id in enumerate(NODE_IDS)}
+NODE_PHASES: dict[str, str] = dict(zip(NODE_IDS, NODE_PHASE_BY_INDEX))
+_ORJSON_OPTS = orjson.OPT_NON_STR_KEYS
+
+
+@lru_cache(maxsize=256)
+def _encoded_error_body(code: str, message: str) -> bytes:
+    payload = ApiErrorEnvelope(error=ApiErrorBody(code=code, message=message))
+    return orjson.dumps(payload.model_dump())
 
 
 def _error_response(
@@ -134,26 +146,68 @@ def _error_response(
     code: str,
     message: str,
     details: object | None = None,
-) -> JSONResponse:
-    payload = ApiErrorEnvelope(error=ApiErrorBody(code=code, message=message, details=details))
-    return JSONResponse(status_code=status_code, content=payload.model_dump())
+) -> Response:
+    if details is None:
+        return Response(
+            content=_encoded_error_body(code, message),
+            status_code=status_code,
+            media_type="application/json",
+        )
+    body = {"error": {"code": code, "message": message, "details": details}}
+    return Response(
+        content=orjson.dumps(body, default=str, option=_ORJSON_OPTS),
+        status_code=status_code,
+        media_type="application/json",
+    )
+
+
+@lru_cache(maxsize=64)
+def _sse_frame_prefix(event_name: str) -> bytes:
+    return b"event: " + event_name.encode() + b"\ndata: "
 
 
-def _format_sse(event_name: str, payload: dict[str, object]) -> str:
-    return f"event: {event_name}\ndata: {json.dumps(payload, default=str)}\n\n"
+def _model_content(value: object) -> object:
+    return value.model_dump() if isinstance(value, BaseModel) else value
+
+
+def _format_sse(event_name: str, payload: dict[str, object]) -> bytes:
+    return b"".join(
+        (
+            _sse_frame_prefix(event_name),
+            orjson.dumps(payload, default=str, option=_ORJSON_OPTS),
+            b"\n\n",
+        )
+    )
+
+
+_iso_now_ms = -1
+_iso_now_text = ""
 
 
 def _iso_utc_now() -> str:
-    return datetime.now(timezone.utc).isoformat()
+    """Return the current UTC time at millisecond granularity, formatting once per millisecond."""
+    global _iso_now_ms, _iso_now_text
+    now_ms = time_ns() // 1_000_000
+    if now_ms != _iso_now_ms:
+        _iso_now_text = datetime.fromtimestamp(now_ms / 1000, timezone.utc).isoformat(
+            timespec="milliseconds"
+        )
+        _iso_now_ms = now_ms
+    return _iso_now_text
 
 
 def _extract_token_text(chunk: object) -> str:
+    # Message chunks with plain string content are by far the most common input.
+    content = getattr(chunk, "content", None)
+    if type(content) is str:
+        return content
+    if type(chunk) is str:
+        return chunk
     if chunk is None:
         return ""
     if isinstance(chunk, str):
         return chunk
 
-    content = getattr(chunk, "content", None)
     if isinstance(content, str):
         return content
     if isinstance(content, list):
@@ -182,62 +236,94 @@ def _extract_token_text(chunk: object) -> str:
 def _parse_langgraph_stream_item(
     item: object,
 ) -> tuple[tuple[str, ...] | None, str | None, object]:
-    if isinstance(item, tuple):
-        if len(item) == 3 and isinstance(item[1], str):
-            raw_namespace = item[0]
-            if raw_namespace is None:
-                namespace = None
-            elif isinstance(raw_namespace, tuple):
-                namespace = tuple(str(part) for part in raw_namespace)
-            elif isinstance(raw_namespace, list):
-                namespace = tuple(str(part) for part in raw_namespace)
-            else:
-                namespace = (str(raw_namespace),)
-            return namespace, item[1], item[2]
-
-        if len(item) == 2 and isinstance(item[0], str):
-            return None, item[0], item[1]
+    if not isinstance(item, tuple):
+        return None, None, item
+
+    size = len(item)
+    # With subgraphs=True and a list of stream modes LangGraph always yields
+    # (namespace_of_str, mode, data); pass such items through untouched.
+    if size == 3 and type(item[1]) is str:
+        raw_namespace = item[0]
+        if type(raw_namespace) is tuple and all(type(part) is str for part in raw_namespace):
+            return raw_namespace, item[1], item[2]
+
+    if size == 3 and isinstance(item[1], str):
+        raw_namespace = item[0]
+        if raw_namespace is None:
+            namespace = None
+        elif isinstance(raw_namespace, (tuple, list)):
+            namespace = tuple(map(str, raw_namespace))
+        else:
+            namespace = (str(raw_namespace),)
+        return namespace, item[1], item[2]
+
+    if size == 2 and isinstance(item[0], str):
+        return None, item[0], item[1]
 
     return None, None, item
 
 
-def _extract_node_name(payload: object, depth: int = 0) -> str | None:
-    if depth > 4:
-        return None
-
-    if isinstance(payload, dict):
-        for key in ("node", "name", "task_name"):
-            value = payload.get(key)
-            if isinstance(value, str) and value.strip():
-                return value
-
-        for key in ("data", "payload", "metadata", "state", "input", "output"):
-            if key in payload:
-                found = _extract_node_name(payload[key], depth + 1)
-                if found:
-                    return found
-
-        for value in payload.values():
-            found = _extract_node_name(value, depth + 1)
-            if found:
-                return found
-
-    if isinstance(payload, (list, tuple)):
-        for value in payload:
-            found = _extract_node_name(value, depth + 1)
-            if found:
-                return found
+_NODE_NAME_KEYS = ("node", "name", "task_name")
+_NODE_NAME_CONTAINER_KEYS = ("data", "payload", "metadata", "state", "input", "output")
+_NODE_NAME_MAX_DEPTH = 4
+_NODE_NAME_MAX_SEEN = 64
+
+
+def _extract_node_name(payload: object) -> str | None:
+    """Breadth-first search for a node name, preferring well-known container keys."""
+    queue: deque[tuple[object, int]] = deque(((payload, 0),))
+    seen: set[int] = set()
+
+    while queue:
+        current, depth = queue.popleft()
+        if isinstance(current, dict):
+            for key in _NODE_NAME_KEYS:
+                value = current.get(key)
+                if isinstance(value, str) and value.strip():
+                    return value
+            if depth >= _NODE_NAME_MAX_DEPTH:
+                continue
+            children = [current[key] for key in _NODE_NAME_CONTAINER_KEYS if key in current]
+            children.extend(
+                value for key, value in current.items() if key not in _NODE_NAME_CONTAINER_KEYS
+            )
+        elif isinstance(current, (list, tuple)):
+            if depth >= _NODE_NAME_MAX_DEPTH:
+                continue
+            children = current
+        else:
+            continue
+
+        for child in children:
+            if not isinstance(child, (dict, list, tuple)):
+                continue
+            child_id = id(child)
+            if child_id in seen:
+                continue
+            if len(seen) < _NODE_NAME_MAX_SEEN:
+                seen.add(child_id)
+            queue.append((child, depth + 1))
 
     return None
 
 
 class StreamRuntimeState:
-    def __init__(self) -> None:
+    __slots__ = (
+        "node_iterations",
+        "node_task_started",
+        "node_task_id",
+        "token_count",
+        "current_active_node",
+        "include_raw",
+    )
+
+    def __init__(self, include_raw: bool = STREAM_INCLUDE_RAW) -> None:
         self.node_iterations: dict[str, int] = {node_id: 0 for node_id in NODE_IDS}
-        self.node_task_started: dict[str, float] = {}
+        self.node_task_started: dict[str, int] = {}
         self.node_task_id: dict[str, str] = {}
         self.token_count = 0
         self.current_active_node: str | None = None
+        self.include_raw = include_raw
 
     def ensure_node(self, node_id: str) -> None:
         if node_id not in self.node_iterations:
@@ -279,16 +365,16 @@ def _extract_debug_metadata(data: object) -> dict[str, Any]:
 
 def _summarize_update(node: str, update: object) -> dict[str, Any]:
     if not isinstance(update, dict):
+        kind = type(update).__name__
         return {
             "node": node,
-            "kind": type(update).__name__,
-            "text": f"received {type(update).__name__} update payload",
+            "kind": kind,
+            "text": f"received {kind} update payload",
         }
 
     summary: dict[str, Any] = {
         "node": node,
         "kind": "dict",
-        "keys": sorted(str(key) for key in update.keys()),
     }
 
     current_step_idx = update.get("current_step_idx")
@@ -344,77 +430,123 @@ def _summarize_update(node: str, update: object) -> dict[str, Any]:
         text = f"planned files={summary['planned_files']}"
     elif "current_step_idx" in summary:
         text = f"step index now {summary['current_step_idx']}"
-    elif "keys" in summary:
-        text = f"keys: {', '.join(summary['keys'][:4])}"
     else:
-        text = "update payload processed"
+        # Only the fallback text shows keys, so collect a bounded preview lazily.
+        keys = [str(key) for key in islice(update, 4)]
+        summary["keys"] = keys
+        text = f"keys: {', '.join(keys)}"
 
     summary["text"] = text
     return summary
 
 
-def _exception_chain(exc: BaseException, max_depth: int = 5) -> list[str]:
-    chain: list[str] = []
-    current: BaseException | None = exc
-    depth = 0
-    while current is not None and depth < max_depth:
-        message = str(current).strip() or current.__class__.__name__
-        chain.append(message)
-        current = current.__cause__ or current.__context__
-        depth += 1
-    return chain
-
-
-def _classify_exception(exc: BaseException) -> dict[str, str]:
-    chain = _exception_chain(exc)
-    merged = " ".join(chain).lower()
+_MAX_CHAIN_MESSAGE_CHARS = 2000
+_CLASSIFICATION_TEXT_LIMIT = 4096
 
-    if "rate limit" in merged or "429" in merged:
-        return {
+# Ordered by priority: the first matching category wins, regardless of where
+# in the exception chain the keyword appears. Patterns match lowercased bytes.
+_EXCEPTION_CLASSIFIERS: tuple[tuple[re.Pattern[bytes], dict[str, str]], ...] = (
+    (
+        re.compile(rb"rate limit|429"),
+        {
             "error_type": "rate_limit",
             "severity": "error",
             "hint": "Provider rate limit hit. Retry later or reduce prompt/output size.",
-        }
-    if any(term in merged for term in ("api key", "authentication", "unauthorized", "403", "401")):
-        return {
+        },
+    ),
+    (
+        re.compile(rb"api key|authentication|unauthorized|403|401"),
+        {
             "error_type": "auth_error",
             "severity": "error",
             "hint": "Authentication failed. Check your X-API-KEY / api_key value.",
-        }
-    if any(term in merged for term in ("connection refused", "connection error", "connecterror", "timeout")):
-        return {
+        },
+    ),
+    (
+        re.compile(rb"connection refused|connection error|connecterror|timeout"),
+        {
             "error_type": "connection_error",
             "severity": "error",
             "hint": "Network connection to provider failed. Verify proxy/network settings and try again.",
-        }
-    if any(term in merged for term in ("context length", "max tokens", "too many tokens")):
-        return {
+        },
+    ),
+    (
+        re.compile(rb"context length|max tokens|too many tokens"),
+        {
             "error_type": "context_limit",
             "severity": "error",
             "hint": "Prompt or context is too large. Reduce prompt size or mutable overrides.",
-        }
-    if any(term in merged for term in ("validation", "invalid", "schema")):
-        return {
+        },
+    ),
+    (
+        re.compile(rb"validation|invalid|schema"),
+        {
             "error_type": "invalid_request",
             "severity": "error",
             "hint": "Request or model output validation failed. Check prompt constraints and retry.",
-        }
-    return {
-        "error_type": "unknown_error",
-        "severity": "error",
-        "hint": "Unexpected workflow error. Inspect raw payload details for diagnosis.",
-    }
+        },
+    ),
+)
+_UNKNOWN_EXCEPTION_CLASSIFICATION: dict[str, str] = {
+    "error_type": "unknown_error",
+    "severity": "error",
+    "hint": "Unexpected workflow error. Inspect raw payload details for diagnosis.",
+}
+
+
+def _exception_chain(exc: BaseException, max_depth: int = 5) -> list[str]:
+    chain: list[str] = []
+    current: BaseException | None = exc
+    depth = 0
+    while current is not None and depth < max_depth:
+        message = str(current).strip() or current.__class__.__name__
+        chain.append(message[:_MAX_CHAIN_MESSAGE_CHARS])
+        current = current.__cause__ or current.__context__
+        depth += 1
+    return chain
+
+
+def _classification_text(exc: BaseException, max_depth: int = 5) -> bytes:
+    """Lowercased chain messages joined into one buffer capped at 4 KiB."""
+    buffer = bytearray()
+    current: BaseException | None = exc
+    depth = 0
+    while current is not None and depth < max_depth:
+        message = (str(current).strip() or current.__class__.__name__)[:_CLASSIFICATION_TEXT_LIMIT]
+        encoded = message.lower().encode("utf-8", "replace")
+        remaining = _CLASSIFICATION_TEXT_LIMIT - len(buffer)
+        if len(encoded) >= remaining:
+            buffer.extend(encoded[:remaining])
+            break
+        buffer.extend(encoded)
+        buffer.extend(b" ")
+        current = current.__cause__ or current.__context__
+        depth += 1
+    return bytes(buffer)
+
+
+@lru_cache(maxsize=128)
+def _classify_text(text: bytes) -> dict[str, str]:
+    for pattern, classification in _EXCEPTION_CLASSIFIERS:
+        if pattern.search(text):
+            return classification
+    return _UNKNOWN_EXCEPTION_CLASSIFICATION
+
+
+def _classify_exception(exc: BaseException) -> dict[str, str]:
+    return _classify_text(_classification_text(exc))
 
 
 def _normalize_langgraph_stream_item(
     item: object,
     runtime: StreamRuntimeState,
-) -> list[tuple[str, dict[str, Any]]]:
+) -> Sequence[tuple[str, dict[str, Any]]]:
     namespace, mode, data = _parse_langgraph_stream_item(item)
-    raw = {"namespace": namespace, "mode": mode, "data": data}
+    # Parse-error paths always attach the raw item; regular events only when enabled.
+    raw = {"namespace": namespace, "mode": mode, "data": data} if runtime.include_raw else None
 
     if mode is None:
-        return [
+        return (
             (
                 "on_debug_event",
                 {
@@ -429,8 +561,8 @@ def _normalize_langgraph_stream_item(
                     "namespace": None,
                     "raw": item,
                 },
-            )
-        ]
+            ),
+        )
 
     if mode == "messages":
         chunk = data
@@ -439,35 +571,40 @@ def _normalize_langgraph_stream_item(
             chunk, metadata = data
         runtime.token_count += 1
         active_node = runtime.current_active_node
-        return [
+        token_text = _extract_token_text(chunk)
+        if active_node:
+            activity_score = 0.9
+            phase = NODE_PHASES.get(active_node, "llm")
+            message = f"Streaming model output token for '{active_node}'."
+        else:
+            activity_score = 0.0
+            phase = "llm"
+            message = "Streaming model output token."
+        return (
             (
                 "on_chat_model_stream",
                 {
                     "node": active_node,
                     "state": None,
-                    "activity_score": 0.9 if active_node else 0.0,
-                    "phase": NODE_PHASES.get(active_node, "llm") if active_node else "llm",
+                    "activity_score": activity_score,
+                    "phase": phase,
                     "severity": "debug",
-                    "message": (
-                        f"Streaming model output token for '{active_node}'."
-                        if active_node
-                        else "Streaming model output token."
-                    ),
-                    "token": _extract_token_text(chunk),
+                    "message": message,
+                    "token": token_text,
                     "metadata": metadata,
                     "details": {
                         "token_index": runtime.token_count,
-                        "token_length": len(_extract_token_text(chunk)),
+                        "token_length": len(token_text),
                     },
                     "namespace": namespace,
                     "raw": raw,
                 },
-            )
-        ]
+            ),
+        )
 
     if mode == "updates":
         if not isinstance(data, dict):
-            return [
+            return (
                 (
                     "on_debug_event",
                     {
@@ -480,18 +617,20 @@ def _normalize_langgraph_stream_item(
                         "message": "`updates` mode payload was not a dict.",
                         "details": {"received_type": type(data).__name__},
                         "namespace": namespace,
-                        "raw": raw,
+                        "raw": {"namespace": namespace, "mode": mode, "data": data},
                     },
-                )
-            ]
+                ),
+            )
         update_events: list[tuple[str, dict[str, Any]]] = []
         for node_name, update in data.items():
-            node = str(node_name)
+            node = node_name if type(node_name) is str else str(node_name)
             runtime.ensure_node(node)
             summary = _summarize_update(node, update)
             iteration = runtime.node_iterations.get(node) or None
             started_at = runtime.node_task_started.pop(node, None)
-            duration_ms = int((perf_counter() - started_at) * 1000) if started_at else None
+            duration_ms = (
+                (perf_counter_ns() - started_at) // 1_000_000 if started_at is not None else None
+            )
             runtime.node_task_id.pop(node, None)
             if runtime.current_active_node == node:
                 runtime.current_active_node = None
@@ -530,6 +669,8 @@ def _normalize_langgraph_stream_item(
 
         if isinstance(node, str) and node.strip():
             runtime.ensure_node(node)
+        node_phase = NODE_PHASES.get(node, "runtime") if node else "runtime"
+        triggers = metadata.get("triggers")
 
         should_emit_start = False
         start_message = None
@@ -547,7 +688,7 @@ def _normalize_langgraph_stream_item(
             runtime.node_iterations[node] = runtime.node_iterations.get(node, 0) + 1
             iteration = runtime.node_iterations[node]
             runtime.current_active_node = node
-            runtime.node_task_started[node] = perf_counter()
+            runtime.node_task_started[node] = perf_counter_ns()
             if isinstance(task_id, str):
                 runtime.node_task_id[node] = task_id
 
@@ -558,7 +699,7 @@ def _normalize_langgraph_stream_item(
                         "node": node,
                         "state": "active",
                         "activity_score": 1.0,
-                        "phase": NODE_PHASES.get(node, "runtime"),
+                        "phase": node_phase,
                         "severity": "info",
                         "message": (start_message or "Node '{node}' is now active and thinking.").format(
                             node=node,
@@ -568,7 +709,7 @@ def _normalize_langgraph_stream_item(
                             "debug_type": debug_type,
                             "step": step,
                             "task_id": task_id,
-                            "triggers": metadata.get("triggers"),
+                            "triggers": triggers,
                             "iteration": iteration,
                         },
                         "iteration": iteration,
@@ -582,7 +723,7 @@ def _normalize_langgraph_stream_item(
         if debug_type == "task_result" and isinstance(node, str):
             started_at = runtime.node_task_started.get(node)
             if started_at is not None:
-                duration_ms = int((perf_counter() - started_at) * 1000)
+                duration_ms = (perf_counter_ns() - started_at) // 1_000_000
 
         debug_message = "Debug event observed from LangGraph runtime."
         if debug_type == "task" and isinstance(node, str):
@@ -606,14 +747,14 @@ def _normalize_langgraph_stream_item(
                     "node": node,
                     "state": None,
                     "activity_score": 0.6 if node else 0.0,
-                    "phase": NODE_PHASES.get(node, "runtime") if node else "runtime",
+                    "phase": node_phase,
                     "severity": "debug",
                     "message": debug_message,
                     "details": {
                         "debug_type": debug_type,
                         "step": step,
                         "task_id": task_id,
-                        "triggers": metadata.get("triggers"),
+                        "triggers": triggers,
                         "error": metadata.get("error"),
                         "interrupts": metadata.get("interrupts"),
                     },
@@ -626,7 +767,7 @@ def _normalize_langgraph_stream_item(
         )
         return events
 
-    return [
+    return (
         (
             "on_debug_event",
             {
@@ -640,10 +781,92 @@ def _normalize_langgraph_stream_item(
                 "message": f"Unhandled stream mode '{mode}'.",
                 "details": {"mode": mode},
                 "namespace": namespace,
-                "raw": raw,
+                "raw": {"namespace": namespace, "mode": mode, "data": data},
             },
-        )
-    ]
+        ),
+    )
+
+
+# Shared, never mutated: frames are serialized as soon as they are emitted.
+_FINALIZE_STATUS: dict[str, str] = {"status": "completed_on_finalize"}
+_FINALIZE_RAW: dict[str, str] = {"source": "stream_finalize"}
+
+_SSE_QUEUE_MAXSIZE = 256
+_SSE_BATCH_MAX_EVENTS = 16
+_SSE_BATCH_WINDOW_MS = 4
+_SSE_BATCH_WINDOW_MAX_MS = 50
+_SSE_STREAM_DONE = object()
+# Comment frames are ignored by SSE clients but keep idle proxies from closing the stream.
+_SSE_KEEPALIVE_SECONDS = 15.0
+_SSE_KEEPALIVE_FRAME = b": keep-alive\n\n"
+
+
+def _take_ready_frames(queue: asyncio.Queue[object], batch: list[bytes]) -> bool:
+    """Move already-queued frames into ``batch``; return True once the stream is done."""
+    while len(batch) < _SSE_BATCH_MAX_EVENTS:
+        try:
+            frame = queue.get_nowait()
+        except asyncio.QueueEmpty:
+            return False
+        if frame is _SSE_STREAM_DONE:
+            return True
+        batch.append(frame)
+    return False
+
+
+async def _next_frame(queue: asyncio.Queue[object], timeout: float) -> object | None:
+    """Return the next queued item, or None if nothing arrived within ``timeout``."""
+    try:
+        return queue.get_nowait()
+    except asyncio.QueueEmpty:
+        pass
+    # Unlike wait_for, a getter that finishes just as the timeout fires keeps its
+    # result here, so an item arriving at the deadline is returned, not dropped.
+    getter = asyncio.ensure_future(queue.get())
+    try:
+        done, _ = await asyncio.wait((getter,), timeout=timeout)
+    except BaseException:
+        getter.cancel()
+        raise
+    if done:
+        return getter.result()
+    getter.cancel()
+    with suppress(asyncio.CancelledError):
+        await getter
+    if getter.cancelled():
+        return None
+    return getter.result()
+
+
+async def _drain_sse_batches(
+    queue: asyncio.Queue[object],
+    window_seconds: float = _SSE_BATCH_WINDOW_MS / 1000,
+    keepalive_seconds: float = _SSE_KEEPALIVE_SECONDS,
+) -> AsyncIterator[bytes]:
+    """Coalesce queued SSE frames into chunks of up to 16 events per flush window.
+
+    A zero window still joins frames that are already queued but never waits for more.
+    A keep-alive comment is yielded whenever no frame arrives for ``keepalive_seconds``.
+    """
+    while True:
+        frame = await _next_frame(queue, keepalive_seconds)
+        if frame is None:
+            yield _SSE_KEEPALIVE_FRAME
+            continue
+        if frame is _SSE_STREAM_DONE:
+            return
+        batch = [frame]
+        done = _take_ready_frames(queue, batch)
+        if window_seconds > 0 and not done and len(batch) < _SSE_BATCH_MAX_EVENTS:
+            await asyncio.sleep(window_seconds)
+            done = _take_ready_frames(queue, batch)
+        yield b"".join(batch)
+        if done:
+            return
+
+
+_ALLOWED_OVERRIDE_NODE_KEYS = frozenset(NODE_PROMPT_CONFIGS)
+_ALLOWED_OVERRIDE_NODE_KEYS_SORTED = sorted(_ALLOWED_OVERRIDE_NODE_KEYS)
 
 
 def _validate_prompt_payload(payload: RunWorkflowRequest) -> None:
@@ -651,28 +874,36 @@ def _validate_prompt_payload(payload: RunWorkflowRequest) -> None:
         raise ValueError("user_prompt must not be empty.")
 
     overrides = payload.prompt_overrides or {}
-    unknown_nodes = sorted(set(overrides.keys()) - set(NODE_PROMPT_CONFIGS.keys()))
+    unknown_nodes = overrides.keys() - _ALLOWED_OVERRIDE_NODE_KEYS
     if unknown_nodes:
         raise ValueError(
             "Invalid prompt_overrides keys. "
-            f"Allowed keys: {sorted(NODE_PROMPT_CONFIGS.keys())}. "
-            f"Received unknown keys: {unknown_nodes}."
+            f"Allowed keys: {_ALLOWED_OVERRIDE_NODE_KEYS_SORTED}. "
+            f"Received unknown keys: {sorted(unknown_nodes)}."
         )
 
-    if payload.mutable_prompt is not None and len(payload.mutable_prompt) > MAX_MUTABLE_PROMPT_CHARS:
+    mutable_prompt = payload.mutable_prompt
+    if mutable_prompt is not None and (length := len(mutable_prompt)) > MAX_MUTABLE_PROMPT_CHARS:
         raise ValueError(
             f"mutable_prompt exceeds {MAX_MUTABLE_PROMPT_CHARS} characters. "
-            f"Current length: {len(payload.mutable_prompt)}"
+            f"Current length: {length}"
         )
 
     for node_id, value in overrides.items():
-        if len(value) > MAX_MUTABLE_PROMPT_CHARS:
+        length = len(value)
+        if length > MAX_MUTABLE_PROMPT_CHARS:
             raise ValueError(
                 f"prompt_overrides.{node_id} exceeds {MAX_MUTABLE_PROMPT_CHARS} characters. "
-                f"Current length: {len(value)}"
+                f"Current length: {length}"
             )
 
 
+def _new_run_id() -> str:
+    # Run ids only need to be unique; 16 url-safe characters are shorter than a UUID
+    # string and the id is repeated in every streamed event.
+    return secrets.token_urlsafe(12)
+
+
 def _resolve_api_key(payload: RunWorkflowRequest, header_api_key: str | None) -> str:
     body_token = (payload.api_key or "").strip()
     header_token = (header_api_key or "").strip()
@@ -687,7 +918,6 @@ def _resolve_workspace_session(
     request_workspace_id: str | None = None,
     query_workspace_id: str | None = None,
 ):
-    workspace_service.cleanup_expired_sessions()
     candidate = (
         (request_workspace_id or "").strip()
         or (query_workspace_id or "").strip()
@@ -697,12 +927,35 @@ def _resolve_workspace_session(
     return workspace_service.resolve_workspace_session(candidate)
 
 
-def _workspace_error_response(exc: Exception) -> JSONResponse:
+def _workspace_files_ndjson(
+    session: workspace_service.WorkspaceSession,
+    entries: Iterator[tuple[str, str | None]],
+) -> Iterator[bytes]:
+    """Yield a session header line, then one line per file as the walker reads it."""
+    yield orjson.dumps(
+        {"workspace_id": session.workspace_id, "expires_at": session.expires_at_iso}
+    ) + b"\n"
+    for path, content in entries:
+        if content is None:
+            yield orjson.dumps({"path": path, "skipped_binary": True}) + b"\n"
+        else:
+            yield orjson.dumps({"path": path, "content": content}) + b"\n"
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    return any(tag.strip() in (etag, "*") for tag in if_none_match.split(","))
+
+
+def _prefers_plain_text(accept: str) -> bool:
+    return "text/plain" in accept and "application/json" not in accept
+
+
+def _workspace_error_response(exc: workspace_service.WorkspaceError) -> Response:
     if isinstance(exc, workspace_service.WorkspaceValidationError):
         return _error_response(422, "workspace_validation_error", str(exc))
     if isinstance(exc, workspace_service.WorkspaceBinaryFileError):
         return _error_response(422, "workspace_binary_file", str(exc))
-    if isinstance(exc, FileNotFoundError):
+    if isinstance(exc, workspace_service.WorkspaceNotFoundError):
         return _error_response(404, "workspace_not_found", str(exc))
     if isinstance(exc, workspace_service.WorkspaceConflictError):
         return _error_response(409, "workspace_conflict", str(exc))
@@ -710,16 +963,65 @@ def _workspace_error_response(exc: Exception) -> JSONResponse:
     return _error_response(500, "workspace_error", message)
 
 
-def _require_workspace_auth(
-    x_api_key: str | None = Header(default=None, alias="X-API-KEY"),
-) -> None:
-    if not SECURITY_CONFIG.require_workspace_auth:
-        return
-    if (x_api_key or "").strip():
-        return
-    raise WorkspaceAuthRequiredError(
-        "Workspace API authentication required. Provide a non-empty X-API-KEY header."
-    )
+_WORKSPACE_PATH_PREFIX = "/workspace"
+_WORKSPACE_AUTH_REQUIRED_MESSAGE = (
+    "Workspace API authentication required. Provide a non-empty X-API-KEY header."
+)
+
+
+def _has_api_key_header(headers: list[tuple[bytes, bytes]]) -> bool:
+    for name, value in headers:
+        if name == b"x-api-key" and value.strip():
+            return True
+    return False
+
+
+class WorkspaceAuthMiddleware:
+    """Reject workspace requests without an X-API-KEY header before routing.
+
+    Because the check runs before the router, an unauthenticated request to an unknown
+    ``/workspace/*`` path gets 401 rather than 404, so route names are not probeable.
+    CORSMiddleware is added after this one and therefore wraps it, so the 401 still
+    carries CORS headers and preflight requests are answered without a key.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] == "http"
+            and SECURITY_CONFIG.require_workspace_auth
+            and (
+                scope["path"] == _WORKSPACE_PATH_PREFIX
+                or scope["path"].startswith(_WORKSPACE_PATH_PREFIX + "/")
+            )
+            and not _has_api_key_header(scope["headers"])
+        ):
+            response = _error_response(401, "workspace_unauthorized", _WORKSPACE_AUTH_REQUIRED_MESSAGE)
+            await response(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
+
+
+async def _session_janitor() -> None:
+    while True:
+        await asyncio.sleep(SESSION_CLEANUP_INTERVAL_SECONDS)
+        try:
+            await run_in_threadpool(workspace_service.cleanup_expired_sessions)
+        except Exception:  # pragma: no cover
+            logger.exception("Workspace session cleanup failed.")
+
+
+@asynccontextmanager
+async def _lifespan(_app: FastAPI):
+    janitor = asyncio.create_task(_session_janitor())
+    try:
+        yield
+    finally:
+        janitor.cancel()
+        with suppress(asyncio.CancelledError):
+            await janitor
 
 
 app = FastAPI(
@@ -728,8 +1030,11 @@ app = FastAPI(
         "Backend API for workflow execution and guarded prompt schema retrieval. "
         "Frontend is served separately."
     ),
+    lifespan=_lifespan,
 )
 
+# Registered before CORS so CORS stays outermost and 401s still carry CORS headers.
+app.add_middleware(WorkspaceAuthMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=SECURITY_CONFIG.cors_allowed_origins,
@@ -749,13 +1054,9 @@ async def handle_validation_error(_, exc: RequestValidationError):  # pragma: no
     )
 
 
-@app.exception_handler(WorkspaceAuthRequiredError)
-async def handle_workspace_auth_error(_, exc: WorkspaceAuthRequiredError):  # pragma: no cover
-    return _error_response(
-        status_code=401,
-        code="workspace_unauthorized",
-        message=str(exc),
-    )
+@app.exception_handler(workspace_service.WorkspaceError)
+async def handle_workspace_error(_, exc: workspace_service.WorkspaceError):
+    return _workspace_error_response(exc)
 
 
 @app.exception_handler(Exception)
@@ -768,8 +1069,21 @@ async def handle_unexpected_error(_, exc: Exception):  # pragma: no cover
     )
 
 
+# These payloads only depend on import-time constants, so they are encoded once.
+_PROMPT_POLICY_BODY = orjson.dumps(guarded_prompt_policy())
+_PROMPT_SCHEMA_BODY = orjson.dumps(prompt_schema())
+_GRAPH_SCHEMA_BODY = orjson.dumps(get_graph_schema())
+_GRAPH_SCHEMA_ETAG = f'"{hashlib.blake2b(_GRAPH_SCHEMA_BODY, digest_size=16).hexdigest()}"'
+
+
+def _json_body_response(body: bytes, etag: str | None = None) -> Response:
+    headers = {"ETag": etag} if etag else None
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
 @app.get("/health")
-def health() -> dict[str, str | int | bool]:
+async def health() -> dict[str, str | int | bool]:
+    # Security flags are read per request so runtime config changes are reflected.
     return {
         "status": "ok",
         "provider": PROVIDER_NAME,
@@ -782,65 +1096,54 @@ def health() -> dict[str, str | int | bool]:
 
 
 @app.get("/v1/prompt-policy")
-def prompt_policy() -> dict[str, object]:
-    return guarded_prompt_policy()
+async def prompt_policy() -> Response:
+    return _json_body_response(_PROMPT_POLICY_BODY)
 
 
 @app.get("/api/prompts")
 @app.get("/prompts/schema")
 @app.get("/v1/prompts/schema")
-def prompts_schema() -> dict[str, object]:
-    return prompt_schema()
+async def prompts_schema() -> Response:
+    return _json_body_response(_PROMPT_SCHEMA_BODY)
 
 
 @app.get("/graph/schema")
-def graph_schema() -> dict[str, object]:
-    return get_graph_schema()
+async def graph_schema(
+    if_none_match: str | None = Header(default=None, alias="If-None-Match"),
+) -> Response:
+    if if_none_match and _etag_matches(if_none_match, _GRAPH_SCHEMA_ETAG):
+        return Response(status_code=304, headers={"ETag": _GRAPH_SCHEMA_ETAG})
+    return _json_body_response(_GRAPH_SCHEMA_BODY, _GRAPH_SCHEMA_ETAG)
 
 
 @app.post("/workspace/session", response_model=WorkspaceSessionResponse)
-def workspace_session_create(_auth: None = Depends(_require_workspace_auth)):
-    try:
-        workspace_service.cleanup_expired_sessions()
-        session = workspace_service.create_session()
-        return WorkspaceSessionResponse(**session.to_public())
-    except Exception as exc:  # pragma: no cover
-        return _workspace_error_response(exc)
+async def workspace_session_create():
+    session = await run_in_threadpool(workspace_service.create_session)
+    return WorkspaceSessionResponse(**session.to_public())
 
 
 @app.post("/workspace/session/{workspace_id}/touch", response_model=WorkspaceSessionResponse)
-def workspace_session_touch(
+async def workspace_session_touch(
     workspace_id: str,
-    _auth: None = Depends(_require_workspace_auth),
 ):
-    try:
-        workspace_service.cleanup_expired_sessions()
-        session = workspace_service.touch_session(workspace_id)
-        return WorkspaceSessionResponse(**session.to_public())
-    except Exception as exc:
-        return _workspace_error_response(exc)
+    session = await run_in_threadpool(workspace_service.touch_session, workspace_id)
+    return WorkspaceSessionResponse(**session.to_public())
 
 
 @app.delete("/workspace/session/{workspace_id}")
-def workspace_session_delete(
+async def workspace_session_delete(
     workspace_id: str,
-    _auth: None = Depends(_require_workspace_auth),
 ):
-    try:
-        workspace_service.cleanup_expired_sessions()
-        workspace_service.delete_session(workspace_id)
-        return {"workspace_id": workspace_id, "deleted": True}
-    except Exception as exc:
-        return _workspace_error_response(exc)
+    await run_in_threadpool(workspace_service.delete_session, workspace_id)
+    return {"workspace_id": workspace_id, "deleted": True}
 
 
 @app.get("/workspace/tree", response_model=WorkspaceTreeResponse)
-def workspace_tree(
+async def workspace_tree(
     workspace_id: str | None = Query(default=None),
     x_workspace_id: str | None = Header(default=None, alias="X-Workspace-ID"),
-    _auth: None = Depends(_require_workspace_auth),
 ):
-    try:
+    def build() -> WorkspaceTreeResponse:
         session = _resolve_workspace_session(
             header_workspace_id=x_workspace_id,
             query_workspace_id=workspace_id,
@@ -848,66 +1151,84 @@ def workspace_tree(
         return WorkspaceTreeResponse(
             root="generated_project",
             workspace_id=session.workspace_id,
-            expires_at=session.expires_at.isoformat(),
+            expires_at=session.expires_at_iso,
             nodes=workspace_service.list_tree(workspace_id=session.workspace_id),
         )
-    except Exception as exc:  # pragma: no cover
-        return _workspace_error_response(exc)
+
+    return await run_in_threadpool(build)
 
 
 @app.get("/workspace/files", response_model=WorkspaceFilesResponse)
-def workspace_files(
+async def workspace_files(
     workspace_id: str | None = Query(default=None),
+    response_format: Literal["json", "ndjson"] = Query(default="json", alias="format"),
     x_workspace_id: str | None = Header(default=None, alias="X-Workspace-ID"),
-    _auth: None = Depends(_require_workspace_auth),
 ):
-    try:
+    def build() -> WorkspaceFilesResponse | StreamingResponse:
         session = _resolve_workspace_session(
             header_workspace_id=x_workspace_id,
             query_workspace_id=workspace_id,
         )
+        if response_format == "ndjson":
+            entries = workspace_service.iter_flat_text_files(workspace_id=session.workspace_id)
+            return StreamingResponse(
+                _workspace_files_ndjson(session, entries),
+                media_type="application/x-ndjson",
+            )
         files, skipped_binary = workspace_service.list_flat_text_files(
             workspace_id=session.workspace_id
         )
         return WorkspaceFilesResponse(
             workspace_id=session.workspace_id,
-            expires_at=session.expires_at.isoformat(),
+            expires_at=session.expires_at_iso,
             files=files,
             skipped_binary=skipped_binary,
         )
-    except Exception as exc:  # pragma: no cover
-        return _workspace_error_response(exc)
+
+    return await run_in_threadpool(build)
 
 
 @app.get("/workspace/file", response_model=WorkspaceFileResponse)
-def workspace_file(
+async def workspace_file(
+    response: Response,
     path: str = Query(..., min_length=1),
     workspace_id: str | None = Query(default=None),
     x_workspace_id: str | None = Header(default=None, alias="X-Workspace-ID"),
-    _auth: None = Depends(_require_workspace_auth),
+    if_none_match: str | None = Header(default=None, alias="If-None-Match"),
+    accept: str | None = Header(default=None),
 ):
-    try:
+    def build() -> WorkspaceFileResponse | Response:
         session = _resolve_workspace_session(
             header_workspace_id=x_workspace_id,
             query_workspace_id=workspace_id,
         )
+        etag = workspace_service.text_file_etag(path, workspace_id=session.workspace_id)
+        headers = {"ETag": etag, "Vary": "Accept"}
+        if if_none_match and _etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=headers)
+        content = workspace_service.read_text_file(path, workspace_id=session.workspace_id)
+        if accept and _prefers_plain_text(accept):
+            # Raw editors skip the JSON envelope and its escaping of the whole file.
+            headers["X-Workspace-ID"] = session.workspace_id
+            headers["X-Workspace-Expires-At"] = session.expires_at_iso
+            return PlainTextResponse(content, headers=headers)
+        response.headers.update(headers)
         return WorkspaceFileResponse(
             workspace_id=session.workspace_id,
-            expires_at=session.expires_at.isoformat(),
+            expires_at=session.expires_at_iso,
             path=path,
-            content=workspace_service.read_text_file(path, workspace_id=session.workspace_id),
+            content=content,
         )
-    except Exception as exc:
-        return _workspace_error_response(exc)
+
+    return await run_in_threadpool(build)
 
 
 @app.put("/workspace/file", response_model=WorkspaceFileResponse)
-def workspace_file_write(
+async def workspace_file_write(
     payload: WorkspaceFileWriteRequest,
     x_workspace_id: str | None = Header(default=None, alias="X-Workspace-ID"),
-    _auth: None = Depends(_require_workspace_auth),
 ):
-    try:
+    def build() -> WorkspaceFileResponse:
         session = _resolve_workspace_session(
             header_workspace_id=x_workspace_id,
             request_workspace_id=payload.workspace_id,
@@ -919,21 +1240,20 @@ def workspace_file_write(
         )
         return WorkspaceFileResponse(
             workspace_id=session.workspace_id,
-            expires_at=session.expires_at.isoformat(),
+            expires_at=session.expires_at_iso,
             path=relative,
             content=payload.content,
         )
-    except Exception as exc:
-        return _workspace_error_response(exc)
+
+    return await run_in_threadpool(build)
 
 
 @app.post("/workspace/folder")
-def workspace_folder_create(
+async def workspace_folder_create(
     payload: WorkspaceFolderCreateRequest,
     x_workspace_id: str | None = Header(default=None, alias="X-Workspace-ID"),
-    _auth: None = Depends(_require_workspace_auth),
 ):
-    try:
+    def build() -> dict[str, str]:
         session = _resolve_workspace_session(
             header_workspace_id=x_workspace_id,
             request_workspace_id=payload.workspace_id,
@@ -942,19 +1262,18 @@ def workspace_folder_create(
         return {
             "path": created,
             "workspace_id": session.workspace_id,
-            "expires_at": session.expires_at.isoformat(),
+            "expires_at": session.expires_at_iso,
         }
-    except Exception as exc:
-        return _workspace_error_response(exc)
+
+    return await run_in_threadpool(build)
 
 
 @app.post("/workspace/rename")
-def workspace_path_rename(
+async def workspace_path_rename(
     payload: WorkspaceRenameRequest,
     x_workspace_id: str | None = Header(default=None, alias="X-Workspace-ID"),
-    _auth: None = Depends(_require_workspace_auth),
 ):
-    try:
+    def build() -> dict[str, str]:
         session = _resolve_workspace_session(
             header_workspace_id=x_workspace_id,
             request_workspace_id=payload.workspace_id,
@@ -968,21 +1287,20 @@ def workspace_path_rename(
         return {
             "path": renamed,
             "workspace_id": session.workspace_id,
-            "expires_at": session.expires_at.isoformat(),
+            "expires_at": session.expires_at_iso,
         }
-    except Exception as exc:
-        return _workspace_error_response(exc)
+
+    return await run_in_threadpool(build)
 
 
 @app.delete("/workspace/path")
-def workspace_path_delete(
+async def workspace_path_delete(
     path: str = Query(..., min_length=1),
     recursive: bool = False,
     workspace_id: str | None = Query(default=None),
     x_workspace_id: str | None = Header(default=None, alias="X-Workspace-ID"),
-    _auth: None = Depends(_require_workspace_auth),
 ):
-    try:
+    def build() -> dict[str, str]:
         session = _resolve_workspace_session(
             header_workspace_id=x_workspace_id,
             query_workspace_id=workspace_id,
@@ -995,54 +1313,62 @@ def workspace_path_delete(
         return {
             "path": deleted,
             "workspace_id": session.workspace_id,
-            "expires_at": session.expires_at.isoformat(),
+            "expires_at": session.expires_at_iso,
         }
-    except Exception as exc:
-        return _workspace_error_response(exc)
+
+    return await run_in_threadpool(build)
 
 
 @app.get("/workspace/download")
-def workspace_download(
+async def workspace_download(
     workspace_id: str | None = Query(default=None),
+    compression: Literal["deflate-fast", "store"] = Query(default="deflate-fast"),
     x_workspace_id: str | None = Header(default=None, alias="X-Workspace-ID"),
-    _auth: None = Depends(_require_workspace_auth),
 ):
-    try:
+    def build() -> Iterator[bytes]:
         session = _resolve_workspace_session(
             header_workspace_id=x_workspace_id,
             query_workspace_id=workspace_id,
         )
-        payload = workspace_service.build_workspace_zip(workspace_id=session.workspace_id)
-    except Exception as exc:  # pragma: no cover
-        return _workspace_error_response(exc)
-    return Response(
-        content=payload,
+        return workspace_service.iter_workspace_zip(
+            workspace_id=session.workspace_id,
+            compression=compression,
+        )
+
+    chunks = await run_in_threadpool(build)
+    # Starlette iterates sync generators in its threadpool, keeping file reads off the loop.
+    return StreamingResponse(
+        chunks,
         media_type="application/zip",
         headers={"Content-Disposition": 'attachment; filename="generated_project.zip"'},
     )
 
 
-@app.post("/generate", response_model=RunWorkflowResponse)
-@app.post("/v1/workflows/run", response_model=RunWorkflowResponse)
+# Documented via ``responses`` rather than ``response_model`` so the result is
+# serialized once by orjson instead of being re-validated and re-encoded.
+@app.post("/generate", responses={200: {"model": RunWorkflowResponse}})
+@app.post("/v1/workflows/run", responses={200: {"model": RunWorkflowResponse}})
 async def run_agent_workflow(
     payload: RunWorkflowRequest,
     x_api_key: str | None = Header(default=None, alias="X-API-KEY"),
     x_workspace_id: str | None = Header(default=None, alias="X-Workspace-ID"),
 ):
-    run_id = str(uuid4())
+    run_id = _new_run_id()
     workspace_session = None
 
     try:
         _validate_prompt_payload(payload)
         api_key = _resolve_api_key(payload, x_api_key)
-        workspace_session = _resolve_workspace_session(
+        workspace_session = await run_in_threadpool(
+            _resolve_workspace_session,
             header_workspace_id=x_workspace_id,
             request_workspace_id=payload.workspace_id,
         )
         llm = build_chat_model(api_key=api_key, model=payload.model)
-        with workspace_service.workspace_context(workspace_session.workspace_id):
-            result = await run_in_threadpool(
-                run_workflow,
+        with workspace_service.workspace_context(
+            workspace_session.workspace_id, session=workspace_session
+        ):
+            result = await arun_workflow(
                 payload.user_prompt,
                 llm,
                 payload.recursion_limit,
@@ -1069,29 +1395,33 @@ async def run_agent_workflow(
             details["exception_chain"] = _exception_chain(exc)
         return _error_response(500, "workflow_error", message, details)
 
-    return RunWorkflowResponse(
-        status=result.get("status", "DONE"),
-        provider=PROVIDER_NAME,
-        workspace_id=workspace_session.workspace_id if workspace_session else None,
-        plan=result.get("plan"),
-        task_plan=result.get("detailed_ins"),
-    )
+    body = {
+        "status": result.get("status", "DONE"),
+        "provider": PROVIDER_NAME,
+        "workspace_id": workspace_session.workspace_id if workspace_session else None,
+        "plan": _model_content(result.get("plan")),
+        "task_plan": _model_content(result.get("detailed_ins")),
+    }
+    return _json_body_response(orjson.dumps(body, default=str, option=_ORJSON_OPTS))
 
 
 @app.post("/stream")
 @app.post("/v1/workflows/stream")
 async def stream_agent_workflow(
     payload: RunWorkflowRequest,
+    flush_ms: int = Query(default=_SSE_BATCH_WINDOW_MS, ge=0, le=_SSE_BATCH_WINDOW_MAX_MS),
+    include_raw: bool = Query(default=False),
     x_api_key: str | None = Header(default=None, alias="X-API-KEY"),
     x_workspace_id: str | None = Header(default=None, alias="X-Workspace-ID"),
 ):
-    run_id = str(uuid4())
+    run_id = _new_run_id()
     workspace_session = None
 
     try:
         _validate_prompt_payload(payload)
         api_key = _resolve_api_key(payload, x_api_key)
-        workspace_session = _resolve_workspace_session(
+        workspace_session = await run_in_threadpool(
+            _resolve_workspace_session,
             header_workspace_id=x_workspace_id,
             request_workspace_id=payload.workspace_id,
         )
@@ -1100,34 +1430,50 @@ async def stream_agent_workflow(
         return _error_response(422, "invalid_request", str(exc))
 
     event_id = 0
+    workspace_id = workspace_session.workspace_id if workspace_session else None
     node_states: dict[str, str] = {node_id: "idle" for node_id in NODE_IDS}
     activity_scores: dict[str, float] = {node_id: 0.0 for node_id in NODE_IDS}
     active_node_id: str | None = None
+    # Snapshots are serialized immediately, so one copy can be shared until a value changes.
+    node_states_snapshot: dict[str, str] | None = None
+    activity_snapshot: dict[str, float] | None = None
 
     def emit(
         event_name: str,
         payload_in: dict[str, Any],
-    ) -> str:
-        nonlocal event_id, active_node_id
+    ) -> bytes:
+        nonlocal event_id, active_node_id, node_states_snapshot, activity_snapshot
         event_id += 1
 
         node = payload_in.get("node")
         state = payload_in.get("state")
         activity_score = payload_in.get("activity_score")
 
-        if node in node_states and isinstance(state, str):
-            node_states[node] = state
-        if node in activity_scores and isinstance(activity_score, (float, int)):
-            activity_scores[node] = float(activity_score)
-
-        if event_name == "on_node_start" and isinstance(node, str):
-            active_node_id = node
-        elif event_name == "on_node_end" and isinstance(node, str) and active_node_id == node:
-            active_node_id = None
-
+        # System-level events carry no node and never touch per-node state.
+        if node is not None:
+            if node in node_states and isinstance(state, str) and node_states[node] != state:
+                node_states[node] = state
+                node_states_snapshot = None
+            if node in activity_scores and isinstance(activity_score, (float, int)):
+                score = float(activity_score)
+                if activity_scores[node] != score:
+                    activity_scores[node] = score
+                    activity_snapshot = None
+
+            if event_name == "on_node_start" and isinstance(node, str):
+                active_node_id = node
+            elif event_name == "on_node_end" and isinstance(node, str) and active_node_id == node:
+                active_node_id = None
+        if node_states_snapshot is None:
+            node_states_snapshot = dict(node_states)
+        if activity_snapshot is None:
+            activity_snapshot = dict(activity_scores)
+
+        # Reserved keys are listed first with their defaults to keep the field order
+        # stable; payload_in is then merged over them, extra keys included.
         payload_out = {
             "run_id": run_id,
-            "workspace_id": workspace_session.workspace_id if workspace_session else None,
+            "workspace_id": workspace_id,
             "event_id": event_id,
             "timestamp": _iso_utc_now(),
             "node": node,
@@ -1144,34 +1490,40 @@ async def stream_agent_workflow(
             "namespace": payload_in.get("namespace"),
             "raw": payload_in.get("raw"),
             "active_node_id": active_node_id,
-            "node_states": dict(node_states),
-            "activity_by_node_id": dict(activity_scores),
-            **{
-                key: value
-                for key, value in payload_in.items()
-                if key
-                not in {
-                    "node",
-                    "state",
-                    "activity_score",
-                    "phase",
-                    "severity",
-                    "message",
-                    "details",
-                    "hint",
-                    "error_type",
-                    "iteration",
-                    "duration_ms",
-                    "namespace",
-                    "raw",
-                }
-            },
+            "node_states": node_states_snapshot,
+            "activity_by_node_id": activity_snapshot,
         }
+        payload_out.update(payload_in)
         return _format_sse(event_name, payload_out)
 
-    async def stream():
-        runtime = StreamRuntimeState()
-        run_started_at = perf_counter()
+    async def produce_frames(queue: asyncio.Queue[object], runtime: StreamRuntimeState) -> None:
+        try:
+            with workspace_service.workspace_context(
+                workspace_session.workspace_id, session=workspace_session
+            ):
+                async for stream_item in astream_workflow(
+                    payload.user_prompt,
+                    llm,
+                    payload.recursion_limit,
+                    payload.mutable_prompt,
+                    payload.prompt_overrides,
+                ):
+                    normalized_events = _normalize_langgraph_stream_item(stream_item, runtime)
+                    for event_name, event_payload in normalized_events:
+                        await queue.put(emit(event_name, event_payload))
+        except asyncio.CancelledError:
+            # The consumer has gone away and will never free a slot, so never wait for one.
+            with suppress(asyncio.QueueFull):
+                queue.put_nowait(_SSE_STREAM_DONE)
+            raise
+        except Exception:
+            await queue.put(_SSE_STREAM_DONE)
+            raise
+        await queue.put(_SSE_STREAM_DONE)
+
+    async def stream() -> AsyncIterator[bytes]:
+        runtime = StreamRuntimeState(include_raw=STREAM_INCLUDE_RAW or include_raw)
+        run_started_at = perf_counter_ns()
         yield emit(
             "run_started",
             {
@@ -1182,7 +1534,7 @@ async def stream_agent_workflow(
                 "severity": "info",
                 "message": "Workflow run started with verbose stream modes: debug/messages/updates.",
                 "details": {
-                    "stream_mode": ["debug", "messages", "updates"],
+                    "stream_mode": STREAM_MODES,
                     "recursion_limit": payload.recursion_limit,
                 },
                 "namespace": None,
@@ -1191,21 +1543,20 @@ async def stream_agent_workflow(
             },
         )
         try:
-            with workspace_service.workspace_context(
-                workspace_session.workspace_id if workspace_session else None
-            ):
-                async for stream_item in astream_workflow(
-                    payload.user_prompt,
-                    llm,
-                    payload.recursion_limit,
-                    payload.mutable_prompt,
-                    payload.prompt_overrides,
-                ):
-                    normalized_events = _normalize_langgraph_stream_item(stream_item, runtime)
-                    for event_name, event_payload in normalized_events:
-                        yield emit(event_name, event_payload)
-
-            for node_id, state in list(node_states.items()):
+            queue: asyncio.Queue[object] = asyncio.Queue(maxsize=_SSE_QUEUE_MAXSIZE)
+            producer = asyncio.create_task(produce_frames(queue, runtime))
+            try:
+                async for frames in _drain_sse_batches(queue, flush_ms / 1000):
+                    yield frames
+                await producer
+            finally:
+                if not producer.done():
+                    producer.cancel()
+                    # Let the cancellation land so the workflow stream is closed before we return.
+                    await asyncio.wait((producer,))
+
+            # emit only reassigns existing keys, so iterating the live dict is safe.
+            for node_id, state in node_states.items():
                 if state == "active":
                     yield emit(
                         "on_node_end",
@@ -1216,10 +1567,10 @@ async def stream_agent_workflow(
                             "phase": NODE_PHASES.get(node_id, "runtime"),
                             "severity": "info",
                             "message": f"Node '{node_id}' completed with update payload.",
-                            "details": {"status": "completed_on_finalize"},
+                            "details": _FINALIZE_STATUS,
                             "namespace": None,
-                            "raw": {"source": "stream_finalize"},
-                            "update": {"status": "completed_on_finalize"},
+                            "raw": _FINALIZE_RAW,
+                            "update": _FINALIZE_STATUS,
                         },
                     )
 
@@ -1232,7 +1583,7 @@ async def stream_agent_workflow(
                     "phase": "system",
                     "severity": "info",
                     "message": "Workflow finished successfully.",
-                    "details": {"run_duration_ms": int((perf_counter() - run_started_at) * 1000)},
+                    "details": {"run_duration_ms": (perf_counter_ns() - run_started_at) // 1_000_000},
                     "namespace": None,
                     "raw": None,
                     "status": "DONE",
@@ -1242,7 +1593,7 @@ async def stream_agent_workflow(
             logger.exception("Workflow stream failed run_id=%s", run_id)
             classification = _classify_exception(exc)
             exc_chain = _exception_chain(exc)
-            run_duration_ms = int((perf_counter() - run_started_at) * 1000)
+            run_duration_ms = (perf_counter_ns() - run_started_at) // 1_000_000
             error_details: dict[str, Any] = {
                 "run_duration_ms": run_duration_ms,
                 "run_id": run_id,
@@ -1254,9 +1605,6 @@ async def stream_agent_workflow(
                 error_details["primary_error"] = exc_chain[0] if exc_chain else None
                 error_details["exception_chain"] = exc_chain
                 raw_error["exception"] = str(exc)
-            if active_node_id and active_node_id in node_states:
-                node_states[active_node_id] = "error"
-                activity_scores[active_node_id] = 0.0
             yield emit(
                 "error",
                 {
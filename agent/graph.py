@@ -2,9 +2,18 @@
 
 from __future__ import annotations
 
-from typing import Any, AsyncIterator, Callable
+import asyncio
+from collections import OrderedDict
+from contextlib import contextmanager, suppress
+from contextvars import ContextVar
+from functools import lru_cache
+import hashlib
+import os
+import threading
+from typing import Any, AsyncIterator, Callable, Iterator, TypeVar
 
 from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.runnables import Runnable, RunnableLambda
 from langchain_core.tools import tool
 from langgraph.constants import END
 from langgraph.graph import StateGraph
@@ -15,6 +24,7 @@ except ImportError:  # pragma: no cover
     create_agent = None
 
 from langgraph.prebuilt import create_react_agent
+from pydantic import BaseModel
 
 try:  # pragma: no cover - allows running module directly
     from .prompts import (
@@ -23,7 +33,7 @@ try:  # pragma: no cover - allows running module directly
         resolve_mutable_for_node,
         planner_prompt,
     )
-    from .state import AgentState, CoderState, Plan, TaskPlan
+    from .state import AgentState, CoderState, ImplementationStep, Plan, TaskPlan
     from .tools import list_files, read_file, write_file
 except ImportError:  # pragma: no cover
     from prompts import (
@@ -32,12 +42,49 @@ except ImportError:  # pragma: no cover
         resolve_mutable_for_node,
         planner_prompt,
     )
-    from state import AgentState, CoderState, Plan, TaskPlan
+    from state import AgentState, CoderState, ImplementationStep, Plan, TaskPlan
     from tools import list_files, read_file, write_file
 
 GraphEvent = dict[str, Any]
 EventCallback = Callable[[GraphEvent], None]
 
+STREAM_MODES: tuple[str, ...] = ("debug", "messages", "updates")
+
+
+# The compiled graph is shared across runs, so per-run dependencies travel in a
+# context variable. LangGraph copies the context into node tasks and executor threads.
+class _RunBindings:
+    __slots__ = ("llm", "event_callback", "coder_agent")
+
+    def __init__(self, llm: BaseChatModel, event_callback: EventCallback | None) -> None:
+        self.llm = llm
+        self.event_callback = event_callback
+        # Built on the first coder step and reused for the rest of the run.
+        self.coder_agent: Any = None
+
+
+_RUN_BINDINGS: ContextVar[_RunBindings] = ContextVar("graph_run_bindings")
+
+
+@contextmanager
+def _bind_run(llm: BaseChatModel, event_callback: EventCallback | None) -> Iterator[None]:
+    token = _RUN_BINDINGS.set(_RunBindings(llm, event_callback))
+    try:
+        yield
+    finally:
+        # A streaming generator may be finalized from another context.
+        with suppress(ValueError):
+            _RUN_BINDINGS.reset(token)
+
+
+def _current_run() -> _RunBindings:
+    try:
+        return _RUN_BINDINGS.get()
+    except LookupError as exc:
+        raise RuntimeError(
+            "Workflow nodes must run inside run_workflow/arun_workflow/astream_workflow."
+        ) from exc
+
 
 def _emit(event_callback: EventCallback | None, event_type: str, **payload: Any) -> None:
     if event_callback is None:
@@ -45,10 +92,91 @@ def _emit(event_callback: EventCallback | None, event_type: str, **payload: Any)
     event_callback({"event": event_type, **payload})
 
 
+# Opt-in: set AGENT_LLM_CACHE_SIZE > 0 to let identical composed prompts for the
+# same model and credential reuse the earlier structured response. Off by default
+# because a hit replays old output instead of regenerating.
+LLM_RESPONSE_CACHE_SIZE = int(os.getenv("AGENT_LLM_CACHE_SIZE", "0").strip() or 0)
+
+_ModelT = TypeVar("_ModelT", Plan, TaskPlan)
+
+
+class _StructuredResponseCache:
+    """Process-local LRU of structured responses, stored as JSON so hits are fresh copies."""
+
+    def __init__(self, max_entries: int) -> None:
+        self._max_entries = max_entries
+        self._entries: OrderedDict[str, str] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: str, value: str) -> None:
+        if self._max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+
+_RESPONSE_CACHE = _StructuredResponseCache(LLM_RESPONSE_CACHE_SIZE)
+
+
+def _normalize_prompt_for_cache(prompt: str) -> str:
+    # Only surrounding whitespace is ignored: case and inner spacing can name files
+    # or shape code blocks, so prompts differing there are different requests.
+    return prompt.strip()
+
+
+def _llm_credential(llm: BaseChatModel) -> str:
+    secret = getattr(llm, "groq_api_key", None) or getattr(llm, "api_key", None)
+    if secret is None:
+        return ""
+    get_secret_value = getattr(secret, "get_secret_value", None)
+    return get_secret_value() if callable(get_secret_value) else str(secret)
+
+
+def _response_cache_key(llm: BaseChatModel, schema: type[BaseModel], prompt: str) -> str:
+    model = getattr(llm, "model_name", None) or getattr(llm, "model", None) or type(llm).__name__
+    # The credential only enters the digest, so a caller with a different key never
+    # hits another caller's entries and no secret is kept in the cache.
+    digest = hashlib.blake2b(digest_size=16)
+    for part in (_llm_credential(llm), str(model), schema.__name__, prompt):
+        digest.update(part.encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def _cached_response(
+    run: _RunBindings,
+    node_id: str,
+    schema: type[_ModelT],
+    prompt: str,
+) -> tuple[str, _ModelT | None]:
+    key = _response_cache_key(run.llm, schema, prompt)
+    cached = _RESPONSE_CACHE.get(key)
+    if cached is None:
+        return key, None
+    _emit(run.event_callback, "cache_hit", node=node_id)
+    return key, schema.model_validate_json(cached)
+
+
+def _store_response(key: str, response: BaseModel | None) -> None:
+    if response is not None:
+        _RESPONSE_CACHE.put(key, response.model_dump_json())
+
+
 def _resolve_node_mutable_prompt(state: AgentState, node_id: str) -> str:
-    prompt_overrides = state.get("prompt_overrides") or {}
-    legacy_mutable = state.get("mutable_prompt")
-    return resolve_mutable_for_node(node_id, prompt_overrides, legacy_mutable)
+    # resolve_mutable_for_node already ignores a missing or non-dict overrides value.
+    return resolve_mutable_for_node(
+        node_id, state.get("prompt_overrides"), state.get("mutable_prompt")
+    )
 
 
 @tool
@@ -57,15 +185,11 @@ def _list_workspace_files(_: str = ".") -> str:
     return list_files.run(".")
 
 
-def _build_coder_tools() -> list[Any]:
-    return [read_file, write_file, _list_workspace_files]
+_CODER_TOOLS = [read_file, write_file, _list_workspace_files]
 
 
-def _planner_agent(
-    llm: BaseChatModel,
-    event_callback: EventCallback | None,
-) -> Callable[[AgentState], dict[str, Any]]:
-    def planner(state: AgentState) -> dict[str, Any]:
+def _planner_agent() -> Runnable[AgentState, dict[str, Any]]:
+    def prepare(state: AgentState, event_callback: EventCallback | None) -> str:
         user_prompt = str(state.get("user_prompt", "")).strip()
         mutable_prompt = _resolve_node_mutable_prompt(state, "planner")
 
@@ -73,9 +197,9 @@ def _planner_agent(
             raise ValueError("user_prompt must not be empty.")
 
         _emit(event_callback, "node_start", node="planner")
-        response = llm.with_structured_output(Plan).invoke(
-            planner_prompt(user_prompt, mutable_layer=mutable_prompt)
-        )
+        return planner_prompt(user_prompt, mutable_layer=mutable_prompt)
+
+    def finish(response: Plan | None, event_callback: EventCallback | None) -> dict[str, Any]:
         if response is None:
             raise ValueError("Planner returned no response.")
 
@@ -88,58 +212,118 @@ def _planner_agent(
         )
         return {"plan": response}
 
-    return planner
+    def planner(state: AgentState) -> dict[str, Any]:
+        run = _current_run()
+        prompt = prepare(state, run.event_callback)
+        key, response = _cached_response(
+            run, "planner", Plan, _normalize_prompt_for_cache(prompt)
+        )
+        if response is None:
+            response = run.llm.with_structured_output(Plan).invoke(prompt)
+            _store_response(key, response)
+        return finish(response, run.event_callback)
+
+    async def aplanner(state: AgentState) -> dict[str, Any]:
+        run = _current_run()
+        prompt = prepare(state, run.event_callback)
+        key, response = _cached_response(
+            run, "planner", Plan, _normalize_prompt_for_cache(prompt)
+        )
+        if response is None:
+            response = await run.llm.with_structured_output(Plan).ainvoke(prompt)
+            _store_response(key, response)
+        return finish(response, run.event_callback)
 
+    return RunnableLambda(planner, afunc=aplanner, name="planner")
 
-def _architect_agent(
-    llm: BaseChatModel,
-    event_callback: EventCallback | None,
-) -> Callable[[AgentState], dict[str, Any]]:
-    def architect(state: AgentState) -> dict[str, Any]:
-        plan = state["plan"]
+
+def _architect_agent() -> Runnable[AgentState, dict[str, Any]]:
+    def prepare(state: AgentState, event_callback: EventCallback | None) -> str:
         mutable_prompt = _resolve_node_mutable_prompt(state, "architect")
 
         _emit(event_callback, "node_start", node="architect")
-        response = llm.with_structured_output(TaskPlan).invoke(
-            architecture_prompt(plan, mutable_layer=mutable_prompt)
-        )
+        return architecture_prompt(state["plan"], mutable_layer=mutable_prompt)
+
+    def finish(
+        state: AgentState,
+        response: TaskPlan | None,
+        event_callback: EventCallback | None,
+    ) -> dict[str, Any]:
         if response is None:
             raise ValueError("Architect returned no response.")
 
-        response.plan = plan
+        response.plan = state["plan"]
         _emit(
             event_callback,
             "node_complete",
             node="architect",
             step_count=len(response.implementation_steps),
         )
+        if not response.implementation_steps:
+            # Nothing to implement, so the workflow ends without entering the coder.
+            return {"detailed_ins": response, "status": "DONE"}
         return {"detailed_ins": response}
 
-    return architect
+    def architect(state: AgentState) -> dict[str, Any]:
+        run = _current_run()
+        prompt = prepare(state, run.event_callback)
+        key, response = _cached_response(run, "architect", TaskPlan, prompt)
+        if response is None:
+            response = run.llm.with_structured_output(TaskPlan).invoke(prompt)
+            _store_response(key, response)
+        return finish(state, response, run.event_callback)
+
+    async def aarchitect(state: AgentState) -> dict[str, Any]:
+        run = _current_run()
+        prompt = prepare(state, run.event_callback)
+        key, response = _cached_response(run, "architect", TaskPlan, prompt)
+        if response is None:
+            response = await run.llm.with_structured_output(TaskPlan).ainvoke(prompt)
+            _store_response(key, response)
+        return finish(state, response, run.event_callback)
 
+    return RunnableLambda(architect, afunc=aarchitect, name="architect")
 
-def _coder_agent(
-    llm: BaseChatModel,
-    event_callback: EventCallback | None,
-) -> Callable[[AgentState], dict[str, Any]]:
-    def coder(state: AgentState) -> dict[str, Any]:
-        coder_state = state.get("coder_state")
-        mutable_prompt = _resolve_node_mutable_prompt(state, "coder")
 
+def _coder_runnable(run: _RunBindings) -> Any:
+    if run.coder_agent is None:
+        if create_agent is not None:
+            run.coder_agent = create_agent(run.llm, _CODER_TOOLS)
+        else:  # pragma: no cover
+            run.coder_agent = create_react_agent(run.llm, _CODER_TOOLS)
+    return run.coder_agent
+
+
+def _read_existing_content(file_path: str) -> str:
+    try:
+        return read_file.run(file_path)
+    except FileNotFoundError:
+        return f"ERROR: File {file_path} does not exist."
+
+
+def _coder_agent() -> Runnable[AgentState, dict[str, Any]]:
+    def next_task(
+        state: AgentState,
+        event_callback: EventCallback | None,
+    ) -> tuple[CoderState, ImplementationStep | None]:
+        """Return the coder state and its pending task, or None when every step is done."""
+        coder_state = state.get("coder_state")
         if coder_state is None:
             coder_state = CoderState(task_plan=state["detailed_ins"], current_step_idx=0)
 
         steps = coder_state.task_plan.implementation_steps
         if coder_state.current_step_idx >= len(steps):
             _emit(event_callback, "node_complete", node="coder", status="DONE")
-            return {"coder_state": coder_state, "status": "DONE"}
-
-        current_task = steps[coder_state.current_step_idx]
-        try:
-            existing_content = read_file.run(current_task.file_path)
-        except FileNotFoundError:
-            existing_content = f"ERROR: File {current_task.file_path} does not exist."
-
+            return coder_state, None
+        return coder_state, steps[coder_state.current_step_idx]
+
+    def step_input(
+        state: AgentState,
+        coder_state: CoderState,
+        current_task: ImplementationStep,
+        existing_content: str,
+        event_callback: EventCallback | None,
+    ) -> dict[str, Any]:
         _emit(
             event_callback,
             "node_start",
@@ -148,53 +332,75 @@ def _coder_agent(
             file_path=current_task.file_path,
         )
 
-        system_prompt = coder_system_prompt(mutable_layer=mutable_prompt)
+        system_prompt = coder_system_prompt(
+            mutable_layer=_resolve_node_mutable_prompt(state, "coder")
+        )
         user_prompt = (
             f"Task: {current_task.task_description}\n"
             f"File: {current_task.file_path}\n"
             f"Existing content:\n{existing_content}\n"
             "Use write_file(path, content) to save your changes."
         )
-
-        coder_tools = _build_coder_tools()
-        if create_agent is not None:
-            runnable_agent = create_agent(llm, coder_tools)
-        else:  # pragma: no cover
-            runnable_agent = create_react_agent(llm, coder_tools)
-
-        runnable_agent.invoke(
-            {
-                "messages": [
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt},
-                ]
-            }
-        )
-
+        return {
+            "messages": [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt},
+            ]
+        }
+
+    def finish_step(coder_state: CoderState, event_callback: EventCallback | None) -> dict[str, Any]:
         coder_state.current_step_idx += 1
         _emit(
             event_callback,
             "node_progress",
             node="coder",
             next_step_index=coder_state.current_step_idx,
-            total_steps=len(steps),
+            total_steps=len(coder_state.task_plan.implementation_steps),
         )
         return {"coder_state": coder_state}
 
-    return coder
+    def coder(state: AgentState) -> dict[str, Any]:
+        run = _current_run()
+        coder_state, current_task = next_task(state, run.event_callback)
+        if current_task is None:
+            return {"coder_state": coder_state, "status": "DONE"}
+        existing_content = _read_existing_content(current_task.file_path)
+        agent_input = step_input(
+            state, coder_state, current_task, existing_content, run.event_callback
+        )
+        _coder_runnable(run).invoke(agent_input)
+        return finish_step(coder_state, run.event_callback)
+
+    async def acoder(state: AgentState) -> dict[str, Any]:
+        run = _current_run()
+        coder_state, current_task = next_task(state, run.event_callback)
+        if current_task is None:
+            return {"coder_state": coder_state, "status": "DONE"}
+        # Keep the file read off the event loop; to_thread carries the workspace context.
+        existing_content = await asyncio.to_thread(_read_existing_content, current_task.file_path)
+        agent_input = step_input(
+            state, coder_state, current_task, existing_content, run.event_callback
+        )
+        await _coder_runnable(run).ainvoke(agent_input)
+        return finish_step(coder_state, run.event_callback)
 
+    return RunnableLambda(coder, afunc=acoder, name="coder")
 
-def build_agent(
-    llm: BaseChatModel,
-    event_callback: EventCallback | None = None,
-):
+
+@lru_cache(maxsize=1)
+def build_agent():
+    """Compile the workflow graph once; each run binds its LLM via ``_bind_run``."""
     graph = StateGraph(AgentState)
-    graph.add_node("planner", _planner_agent(llm, event_callback))
-    graph.add_node("architect", _architect_agent(llm, event_callback))
-    graph.add_node("coder", _coder_agent(llm, event_callback))
+    graph.add_node("planner", _planner_agent())
+    graph.add_node("architect", _architect_agent())
+    graph.add_node("coder", _coder_agent())
 
     graph.add_edge(start_key="planner", end_key="architect")
-    graph.add_edge(start_key="architect", end_key="coder")
+    graph.add_conditional_edges(
+        "architect",
+        lambda state: "END" if state.get("status") == "DONE" else "coder",
+        {"END": END, "coder": "coder"},
+    )
     graph.add_conditional_edges(
         "coder",
         lambda state: "END" if state.get("status") == "DONE" else "coder",
@@ -204,6 +410,18 @@ def build_agent(
     return graph.compile()
 
 
+def _workflow_input(
+    user_prompt: str,
+    mutable_prompt: str | None,
+    prompt_overrides: dict[str, str] | None,
+) -> dict[str, Any]:
+    return {
+        "user_prompt": user_prompt,
+        "mutable_prompt": mutable_prompt,
+        "prompt_overrides": prompt_overrides or {},
+    }
+
+
 def run_workflow(
     user_prompt: str,
     llm: BaseChatModel,
@@ -212,15 +430,29 @@ def run_workflow(
     prompt_overrides: dict[str, str] | None = None,
     event_callback: EventCallback | None = None,
 ) -> dict[str, Any]:
-    agent = build_agent(llm, event_callback=event_callback)
-    return agent.invoke(
-        {
-            "user_prompt": user_prompt,
-            "mutable_prompt": mutable_prompt,
-            "prompt_overrides": prompt_overrides or {},
-        },
-        {"recursion_limit": recursion_limit},
-    )
+    agent = build_agent()
+    with _bind_run(llm, event_callback):
+        return agent.invoke(
+            _workflow_input(user_prompt, mutable_prompt, prompt_overrides),
+            {"recursion_limit": recursion_limit},
+        )
+
+
+async def arun_workflow(
+    user_prompt: str,
+    llm: BaseChatModel,
+    recursion_limit: int = 100,
+    mutable_prompt: str | None = None,
+    prompt_overrides: dict[str, str] | None = None,
+    event_callback: EventCallback | None = None,
+) -> dict[str, Any]:
+    """Run the workflow on the event loop; model calls use the async LLM clients."""
+    agent = build_agent()
+    with _bind_run(llm, event_callback):
+        return await agent.ainvoke(
+            _workflow_input(user_prompt, mutable_prompt, prompt_overrides),
+            {"recursion_limit": recursion_limit},
+        )
 
 
 async def astream_workflow(
@@ -232,20 +464,17 @@ async def astream_workflow(
     event_callback: EventCallback | None = None,
 ) -> AsyncIterator[Any]:
     """Stream verbose LangGraph runtime data for a single workflow run."""
-    agent = build_agent(llm, event_callback=event_callback)
-    async for item in agent.astream(
-        {
-            "user_prompt": user_prompt,
-            "mutable_prompt": mutable_prompt,
-            "prompt_overrides": prompt_overrides or {},
-        },
-        {"recursion_limit": recursion_limit},
-        stream_mode=["debug", "messages", "updates"],
-        print_mode=(),
-        debug=True,
-        subgraphs=True,
-    ):
-        yield item
+    agent = build_agent()
+    with _bind_run(llm, event_callback):
+        async for item in agent.astream(
+            _workflow_input(user_prompt, mutable_prompt, prompt_overrides),
+            {"recursion_limit": recursion_limit},
+            stream_mode=list(STREAM_MODES),
+            print_mode=(),
+            debug=True,
+            subgraphs=True,
+        ):
+            yield item
 
 
 def get_graph_schema() -> dict[str, Any]:
@@ -274,6 +503,13 @@ def get_graph_schema() -> dict[str, Any]:
                 "position": {"x": 720, "y": 160},
                 "data": {"role": "coding"},
             },
+            {
+                "id": "end",
+                "label": "End",
+                "type": "output",
+                "position": {"x": 720, "y": 320},
+                "data": {"role": "terminal"},
+            },
         ],
         "edges": [
             {
@@ -283,12 +519,24 @@ def get_graph_schema() -> dict[str, Any]:
                 "type": "smoothstep",
                 "animated": False,
             },
+            # The architect and coder route through conditional edges in build_agent().
             {
                 "id": "edge-architect-coder",
                 "source": "architect",
                 "target": "coder",
                 "type": "smoothstep",
                 "animated": False,
+                "label": "has steps",
+                "data": {"conditional": True},
+            },
+            {
+                "id": "edge-architect-end",
+                "source": "architect",
+                "target": "end",
+                "type": "smoothstep",
+                "animated": False,
+                "label": "no steps",
+                "data": {"conditional": True},
             },
             {
                 "id": "edge-coder-loop",
@@ -296,6 +544,17 @@ def get_graph_schema() -> dict[str, Any]:
                 "target": "coder",
                 "type": "smoothstep",
                 "animated": True,
+                "label": "next step",
+                "data": {"conditional": True},
+            },
+            {
+                "id": "edge-coder-end",
+                "source": "coder",
+                "target": "end",
+                "type": "smoothstep",
+                "animated": False,
+                "label": "all steps done",
+                "data": {"conditional": True},
             },
         ],
         "state_model": ["idle", "active", "completed", "error"],
@@ -2,11 +2,51 @@
 
 from __future__ import annotations
 
+from collections import OrderedDict
+import hashlib
+import threading
+import time
+
 from langchain_core.language_models.chat_models import BaseChatModel
 from langchain_groq import ChatGroq
 
 PROVIDER_NAME = "groq"
 DEFAULT_GROQ_MODEL = "openai/gpt-oss-120b"
+CHAT_MODEL_CACHE_SIZE = 32
+CHAT_MODEL_CACHE_TTL_SECONDS = 300.0
+
+# Reusing the client keeps its HTTP connection pool warm across requests. Entries are
+# keyed by a digest rather than the raw key, and expire so a client holding a key
+# that is no longer in use does not stay alive for the life of the process.
+_CHAT_MODELS: OrderedDict[str, tuple[float, BaseChatModel]] = OrderedDict()
+_CHAT_MODELS_LOCK = threading.Lock()
+
+
+def _chat_model_cache_key(api_key: str, model: str) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(model.encode())
+    digest.update(b"\0")
+    digest.update(api_key.encode())
+    return digest.hexdigest()
+
+
+def _cached_chat_model(api_key: str, model: str) -> BaseChatModel:
+    key = _chat_model_cache_key(api_key, model)
+    now = time.monotonic()
+    with _CHAT_MODELS_LOCK:
+        for expired in [k for k, (expires_at, _) in _CHAT_MODELS.items() if expires_at <= now]:
+            del _CHAT_MODELS[expired]
+        entry = _CHAT_MODELS.get(key)
+        if entry is not None:
+            _CHAT_MODELS.move_to_end(key)
+            return entry[1]
+
+        client = ChatGroq(api_key=api_key, model=model)
+        _CHAT_MODELS[key] = (now + CHAT_MODEL_CACHE_TTL_SECONDS, client)
+        _CHAT_MODELS.move_to_end(key)
+        while len(_CHAT_MODELS) > CHAT_MODEL_CACHE_SIZE:
+            _CHAT_MODELS.popitem(last=False)
+        return client
 
 
 def build_chat_model(api_key: str, model: str | None = None) -> BaseChatModel:
@@ -15,4 +55,4 @@ def build_chat_model(api_key: str, model: str | None = None) -> BaseChatModel:
         raise ValueError("api_key is required.")
 
     selected_model = (model or DEFAULT_GROQ_MODEL).strip()
-    return ChatGroq(api_key=token, model=selected_model)
+    return _cached_chat_model(token, selected_model)
@@ -3,10 +3,14 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Any
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any
 
 from config.prompts import IMMUTABLE_PROMPT_RULES, MAX_MUTABLE_PROMPT_CHARS, NODE_CONFIG
 
+if TYPE_CHECKING:  # pragma: no cover
+    from agent.state import Plan
+
 
 @dataclass(frozen=True)
 class NodePromptConfig:
@@ -18,11 +22,21 @@ NODE_PROMPT_CONFIGS: dict[str, NodePromptConfig] = {
     node_id: NodePromptConfig(**payload) for node_id, payload in NODE_CONFIG.items()
 }
 
+_IMMUTABLE_RULES_BLOCK = "GLOBAL IMMUTABLE RULES (HIGHEST PRIORITY):\n" + "\n".join(
+    f"- {rule}" for rule in IMMUTABLE_PROMPT_RULES
+)
+
+# Everything ahead of the mutable layer is fixed per node.
+_NODE_PROMPT_PREFIXES: dict[str, str] = {
+    node_id: "\n\n".join(
+        section for section in (_IMMUTABLE_RULES_BLOCK, config.immutable_prefix.strip()) if section
+    )
+    for node_id, config in NODE_PROMPT_CONFIGS.items()
+}
+
 
-def _plan_to_text(plan: Any) -> str:
-    if hasattr(plan, "model_dump_json"):
-        return plan.model_dump_json(indent=2)
-    return str(plan)
+def _plan_to_text(plan: Plan) -> str:
+    return plan.model_dump_json(indent=2)
 
 
 def _get_node_prompt(node_id: str) -> NodePromptConfig:
@@ -41,6 +55,11 @@ def _validate_length(text: str, source: str) -> str:
     return text
 
 
+# Defaults are static config, so they are length-checked once here instead of per prompt.
+for _node_id, _node_prompt in NODE_PROMPT_CONFIGS.items():
+    _validate_length(_node_prompt.default_mutable, f"{_node_id} default_mutable")
+
+
 def _normalize_mutable_layer(mutable_layer: str | None, default_mutable: str) -> str:
     candidate = mutable_layer if mutable_layer is not None else default_mutable
     candidate = candidate or ""
@@ -49,6 +68,8 @@ def _normalize_mutable_layer(mutable_layer: str | None, default_mutable: str) ->
         fallback = default_mutable or ""
         candidate = fallback if fallback.strip() else "No mutable prompt provided."
 
+    if candidate is default_mutable:
+        return candidate
     return _validate_length(candidate, "Mutable prompt")
 
 
@@ -62,10 +83,11 @@ def resolve_mutable_for_node(
     if isinstance(prompt_overrides, dict):
         override_value = prompt_overrides.get(node_id)
         if isinstance(override_value, str) and override_value.strip():
-            return _validate_length(override_value, f"prompt_overrides.{node_id}")
+            # Composition strips the layer anyway; stripping here keeps cache keys stable.
+            return _validate_length(override_value, f"prompt_overrides.{node_id}").strip()
 
     if isinstance(legacy_mutable_prompt, str) and legacy_mutable_prompt.strip():
-        return _validate_length(legacy_mutable_prompt, "mutable_prompt")
+        return _validate_length(legacy_mutable_prompt, "mutable_prompt").strip()
 
     return _normalize_mutable_layer(None, node_prompt.default_mutable)
 
@@ -77,15 +99,13 @@ def default_mutable_for_node(node_id: str) -> str:
 def get_composed_prompt(node_id: str, user_content: str | None, context_block: str) -> str:
     node_prompt = _get_node_prompt(node_id)
     mutable_text = _normalize_mutable_layer(user_content, node_prompt.default_mutable)
-    immutable_rules = "\n".join(f"- {rule}" for rule in IMMUTABLE_PROMPT_RULES)
 
-    sections = [
-        "GLOBAL IMMUTABLE RULES (HIGHEST PRIORITY):\n" + immutable_rules,
-        node_prompt.immutable_prefix.strip(),
-        "MUTABLE LAYER (USER EDITABLE):\n" + mutable_text.strip(),
-        context_block.strip(),
-    ]
-    return "\n\n".join(section for section in sections if section)
+    prompt = (
+        f"{_NODE_PROMPT_PREFIXES[node_id]}\n\n"
+        f"MUTABLE LAYER (USER EDITABLE):\n{mutable_text.strip()}"
+    )
+    context_text = context_block.strip()
+    return f"{prompt}\n\n{context_text}" if context_text else prompt
 
 
 def guarded_prompt_policy() -> dict[str, Any]:
@@ -110,7 +130,7 @@ def planner_prompt(user_prompt: str, mutable_layer: str | None = None) -> str:
     )
 
 
-def architecture_prompt(plan: Any, mutable_layer: str | None = None) -> str:
+def architecture_prompt(plan: Plan, mutable_layer: str | None = None) -> str:
     return get_composed_prompt(
         "architect",
         mutable_layer,
@@ -118,6 +138,8 @@ def architecture_prompt(plan: Any, mutable_layer: str | None = None) -> str:
     )
 
 
+# The coder composes the same system prompt on every step of a run.
+@lru_cache(maxsize=64)
 def coder_system_prompt(mutable_layer: str | None = None) -> str:
     return get_composed_prompt(
         "coder",
@@ -38,13 +38,23 @@ def read_file(path: str) -> str:
         return f"ERROR: File {path} is binary and cannot be read as text."
 
 
+LIST_FILES_LIMIT = 500
+
+
 @tool
-def list_files(directory: str = ".") -> str:
-    """Lists all files inside the 'generated_project' folder."""
+def list_files(directory: str = ".", limit: int = LIST_FILES_LIMIT) -> str:
+    """Lists files inside the 'generated_project' folder, up to `limit` paths (at most 500)."""
+    # The model supplies `limit`, so keep it within 1..LIST_FILES_LIMIT.
+    limit = max(1, min(limit, LIST_FILES_LIMIT))
     try:
-        files = list_relative_files(directory)
+        # One extra path tells us whether the listing was cut short.
+        files = list_relative_files(directory, limit=limit + 1)
     except FileNotFoundError:
         return f"ERROR: {directory} does not exist"
     except WorkspaceValidationError:
         return f"ERROR: {directory} is not a directory"
-    return "\n".join(files) if files else "No files found."
+    if not files:
+        return "No files found."
+    if len(files) > limit:
+        return "\n".join(files[:limit]) + f"\n... (truncated to {limit} files)"
+    return "\n".join(files)
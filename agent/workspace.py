@@ -2,21 +2,48 @@
 
 from __future__ import annotations
 
+import codecs
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
 from contextvars import ContextVar
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta, timezone
-from io import BytesIO
+import errno
+from functools import lru_cache
+import heapq
+from io import RawIOBase
+import os
 from pathlib import Path
 import re
 import shutil
+import stat
 import tempfile
 import threading
+from time import monotonic
+from typing import Callable, Iterable, Iterator, TypeVar
 from uuid import uuid4
 import zipfile
 
 MAX_EDITABLE_FILE_CHARS = 400_000
 SESSION_TTL_SECONDS = 60 * 60
+LISTING_CACHE_TTL_SECONDS = 2.0
+ZIP_STREAM_CHUNK_BYTES = 64 * 1024
+_TEXT_SNIFF_BYTES = 8 * 1024
+FLAT_LISTING_READ_WORKERS = 8
+_PARALLEL_READ_MIN_FILES = 4
+# Source trees compress nearly as well at level 1 as at the zlib default, for far less CPU.
+ZIP_COMPRESSION_MODES: dict[str, tuple[int, int | None]] = {
+    "deflate-fast": (zipfile.ZIP_DEFLATED, 1),
+    "store": (zipfile.ZIP_STORED, None),
+}
+DEFAULT_ZIP_COMPRESSION = "deflate-fast"
+# Already-compressed formats gain nothing from deflate, so they are stored as-is.
+_PRECOMPRESSED_SUFFIXES = frozenset(
+    {".png", ".jpg", ".jpeg", ".gif", ".webp", ".woff", ".woff2", ".zip", ".gz", ".bz2", ".xz"}
+)
+# ZipFile.open(info, "w") takes the deflate level from the ZipInfo. Python 3.13 exposes
+# it as ``compress_level``; older versions only have the slot ZipFile.write() assigns.
+_ZIPINFO_LEVEL_ATTR = "compress_level" if hasattr(zipfile.ZipInfo, "compress_level") else "_compresslevel"
 DEFAULT_WORKSPACE_ID = "default"
 
 BASE_ROOT = Path(__file__).resolve().parent.parent
@@ -27,39 +54,32 @@ WORKSPACE_ROOT = (WORKSPACE_BASE_DIR / DEFAULT_WORKSPACE_ID).resolve()
 _WORKSPACE_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,128}$")
 _ACTIVE_WORKSPACE_ID: ContextVar[str | None] = ContextVar("active_workspace_id", default=None)
 _SESSIONS_LOCK = threading.RLock()
+_LISTING_CACHE_LOCK = threading.Lock()
+_READ_POOL: ThreadPoolExecutor | None = None
+_READ_POOL_LOCK = threading.Lock()
 
+_T = TypeVar("_T")
+_UTF8_DECODER = codecs.getincrementaldecoder("utf-8")
 
-class WorkspaceValidationError(ValueError):
-    """Raised when workspace input is invalid."""
 
+class WorkspaceError(Exception):
+    """Base class for errors raised by workspace operations."""
 
-class WorkspaceConflictError(RuntimeError):
-    """Raised when an operation conflicts with existing filesystem state."""
 
+class WorkspaceValidationError(WorkspaceError, ValueError):
+    """Raised when workspace input is invalid."""
 
-class WorkspaceBinaryFileError(ValueError):
-    """Raised when a file is not UTF-8 text and cannot be edited as text."""
 
+class WorkspaceNotFoundError(WorkspaceError, FileNotFoundError):
+    """Raised when a workspace path does not exist."""
 
-@dataclass(frozen=True)
-class WorkspaceTreeNode:
-    name: str
-    path: str
-    type: str
-    size: int | None = None
-    children: list["WorkspaceTreeNode"] | None = None
 
-    def to_dict(self) -> dict[str, object]:
-        payload: dict[str, object] = {
-            "name": self.name,
-            "path": self.path,
-            "type": self.type,
-        }
-        if self.size is not None:
-            payload["size"] = self.size
-        if self.children is not None:
-            payload["children"] = [child.to_dict() for child in self.children]
-        return payload
+class WorkspaceConflictError(WorkspaceError, RuntimeError):
+    """Raised when an operation conflicts with existing filesystem state."""
+
+
+class WorkspaceBinaryFileError(WorkspaceError, ValueError):
+    """Raised when a file is not UTF-8 text and cannot be edited as text."""
 
 
 @dataclass
@@ -69,25 +89,41 @@ class WorkspaceSession:
     last_accessed: datetime
     expires_at: datetime
     ttl_seconds: int
+    _expires_at_iso: tuple[datetime, str] | None = field(
+        default=None, init=False, repr=False, compare=False
+    )
+
+    @property
+    def expires_at_iso(self) -> str:
+        # expires_at is reassigned whenever the session is touched, so the cached
+        # string is keyed on the datetime it was formatted from.
+        cached = self._expires_at_iso
+        if cached is None or cached[0] is not self.expires_at:
+            cached = (self.expires_at, self.expires_at.isoformat())
+            self._expires_at_iso = cached
+        return cached[1]
 
     def to_public(self) -> dict[str, str]:
         return {
             "workspace_id": self.workspace_id,
-            "expires_at": self.expires_at.isoformat(),
+            "expires_at": self.expires_at_iso,
         }
 
 
 _SESSIONS: dict[str, WorkspaceSession] = {}
+_ACTIVE_SESSION: ContextVar[WorkspaceSession | None] = ContextVar("active_session", default=None)
+# Keyed by (resolved root, listing kind); values are (generation, built_at, listing).
+_LISTING_CACHE: dict[tuple[str, str], tuple[int, float, object]] = {}
+_LISTING_GENERATIONS: dict[str, int] = {}
 
 
 def _utc_now() -> datetime:
     return datetime.now(timezone.utc)
 
 
-def _normalize_workspace_id(workspace_id: str | None) -> str:
-    value = (workspace_id or "").strip()
-    if not value:
-        return DEFAULT_WORKSPACE_ID
+@lru_cache(maxsize=1024)
+def _validate_workspace_id(value: str) -> str:
+    # Session ids recur on every tool call of a run; rejected ids raise and are not cached.
     if not _WORKSPACE_ID_PATTERN.fullmatch(value):
         raise WorkspaceValidationError(
             "workspace_id must match [A-Za-z0-9_-] and be <= 128 characters."
@@ -95,6 +131,13 @@ def _normalize_workspace_id(workspace_id: str | None) -> str:
     return value
 
 
+def _normalize_workspace_id(workspace_id: str | None) -> str:
+    value = (workspace_id or "").strip()
+    if not value or value == DEFAULT_WORKSPACE_ID:
+        return DEFAULT_WORKSPACE_ID
+    return _validate_workspace_id(value)
+
+
 def _session_path(workspace_id: str) -> Path:
     if workspace_id == DEFAULT_WORKSPACE_ID:
         return WORKSPACE_ROOT
@@ -115,14 +158,26 @@ def _effective_workspace_id(explicit_workspace_id: str | None) -> str:
 
 
 @contextmanager
-def workspace_context(workspace_id: str | None):
-    """Bind a workspace id to the current context for tool-based operations."""
-    normalized = _effective_workspace_id(workspace_id)
+def workspace_context(workspace_id: str | None, *, session: WorkspaceSession | None = None):
+    """Bind a workspace id to the current context for tool-based operations.
+
+    Pass an already resolved ``session`` to bind it as-is; async callers resolve it in a
+    worker thread first so ensure_session's lock and mkdir stay off the event loop.
+    """
+    if session is not None:
+        normalized = session.workspace_id
+    else:
+        normalized = _effective_workspace_id(workspace_id)
     token = _ACTIVE_WORKSPACE_ID.set(normalized)
+    session_token = None
     try:
-        ensure_session(normalized)
+        if session is None:
+            session = ensure_session(normalized)
+        session_token = _ACTIVE_SESSION.set(session)
         yield normalized
     finally:
+        if session_token is not None:
+            _ACTIVE_SESSION.reset(session_token)
         _ACTIVE_WORKSPACE_ID.reset(token)
 
 
@@ -219,6 +274,7 @@ def delete_session(workspace_id: str) -> bool:
     with _SESSIONS_LOCK:
         session = _SESSIONS.pop(normalized, None)
     target = session.path if session is not None else _session_path(normalized)
+    _forget_listings(target)
     if target.exists():
         shutil.rmtree(target, ignore_errors=True)
         return True
@@ -226,11 +282,45 @@ def delete_session(workspace_id: str) -> bool:
 
 
 def resolve_workspace_session(workspace_id: str | None = None) -> WorkspaceSession:
-    cleanup_expired_sessions()
+    # Expired sessions are swept periodically by the API lifespan janitor;
+    # ensure_session still recycles the requested session if it has expired.
     return ensure_session(workspace_id)
 
 
+def _session_path_is_current(session: WorkspaceSession) -> bool:
+    # Cheap form of ensure_session's check, without the mkdir in workspace_base_dir().
+    if session.workspace_id == DEFAULT_WORKSPACE_ID:
+        return session.path == WORKSPACE_ROOT
+    return session.path.parent == WORKSPACE_BASE_DIR
+
+
+def _active_session_root(workspace_id: str | None) -> Path | None:
+    """Return the bound session's root while it is still live, without re-running ensure_session.
+
+    Returns None, so the caller falls back to ensure_session, when the session has been
+    removed or replaced, has expired, points at a stale root, or lost its directory.
+    """
+    session = _ACTIVE_SESSION.get()
+    if session is None or (workspace_id is not None and workspace_id != session.workspace_id):
+        return None
+    now = _utc_now()
+    with _SESSIONS_LOCK:
+        if (
+            _SESSIONS.get(session.workspace_id) is not session
+            or _session_expired(session, now)
+            or not _session_path_is_current(session)
+            or not session.path.is_dir()
+        ):
+            return None
+        session.last_accessed = now
+        session.expires_at = now + timedelta(seconds=session.ttl_seconds)
+        return session.path
+
+
 def workspace_root(workspace_id: str | None = None) -> Path:
+    root = _active_session_root(workspace_id)
+    if root is not None:
+        return root
     return resolve_workspace_session(workspace_id).path
 
 
@@ -241,6 +331,12 @@ def _coerce_relative_path(path: str, *, allow_root: bool = False) -> str:
             return "."
         raise WorkspaceValidationError("path must not be empty.")
 
+    if os.name != "nt":
+        # POSIX paths have no drive, and only a leading slash makes them absolute.
+        if value.startswith("/"):
+            raise WorkspaceValidationError("Absolute paths are not allowed.")
+        return value
+
     raw_path = Path(value)
     if raw_path.is_absolute():
         raise WorkspaceValidationError("Absolute paths are not allowed.")
@@ -258,76 +354,219 @@ def resolve_workspace_path(
     """Resolve a relative path into the workspace root with traversal protection."""
     root = workspace_root(workspace_id)
     relative = _coerce_relative_path(path, allow_root=allow_root)
-    candidate = root if relative == "." else (root / relative)
-    resolved = candidate.resolve()
-
-    try:
-        resolved.relative_to(root)
-    except ValueError as exc:
-        raise WorkspaceValidationError("Path escapes workspace root.") from exc
-    return resolved
+    if relative == ".":
+        # Session roots are stored resolved.
+        return root
+
+    # realpath still follows symlinks, so a link inside the workspace cannot point out of it.
+    root_str = str(root)
+    resolved = os.path.realpath(os.path.join(root_str, relative))
+    if resolved != root_str and not resolved.startswith(root_str + os.sep):
+        raise WorkspaceValidationError("Path escapes workspace root.")
+    return Path(resolved)
+
+
+def _invalidate_listings(root: Path) -> None:
+    key = str(root)
+    with _LISTING_CACHE_LOCK:
+        _LISTING_GENERATIONS[key] = _LISTING_GENERATIONS.get(key, 0) + 1
+        _LISTING_CACHE.pop((key, "tree"), None)
+        _LISTING_CACHE.pop((key, "files"), None)
+
+
+def _forget_listings(root: Path) -> None:
+    """Drop every listing-cache record for a session root that is going away."""
+    key = str(root)
+    with _LISTING_CACHE_LOCK:
+        _LISTING_GENERATIONS.pop(key, None)
+        _LISTING_CACHE.pop((key, "tree"), None)
+        _LISTING_CACHE.pop((key, "files"), None)
+
+
+def _cached_listing(root: Path, kind: str, build: Callable[[], _T]) -> _T:
+    """Return a recent listing for ``root``; mutations through this module invalidate it.
+
+    The short TTL bounds staleness for changes made outside the service. Cached
+    values are shared between callers and must be treated as read-only.
+    """
+    key = str(root)
+    now = monotonic()
+    with _LISTING_CACHE_LOCK:
+        generation = _LISTING_GENERATIONS.get(key, 0)
+        cached = _LISTING_CACHE.get((key, kind))
+        if cached is not None:
+            if cached[0] == generation and now - cached[1] < LISTING_CACHE_TTL_SECONDS:
+                return cached[2]  # type: ignore[return-value]
+            # Stale entries can hold whole file maps, so they are not kept around.
+            del _LISTING_CACHE[(key, kind)]
+
+    listing = build()
+    with _LISTING_CACHE_LOCK:
+        for expired_key in [
+            cache_key
+            for cache_key, (_, stored_at, _) in _LISTING_CACHE.items()
+            if now - stored_at >= LISTING_CACHE_TTL_SECONDS
+        ]:
+            del _LISTING_CACHE[expired_key]
+        # Skip storing if a mutation landed while the listing was being built.
+        if _LISTING_GENERATIONS.get(key, 0) == generation:
+            _LISTING_CACHE[(key, kind)] = (generation, now, listing)
+    return listing
 
 
 def _relative_path(path: Path, root: Path) -> str:
     return path.relative_to(root).as_posix()
 
 
-def _sorted_entries(directory: Path) -> list[Path]:
-    return sorted(
-        directory.iterdir(),
-        key=lambda entry: (entry.is_file(), entry.name.lower()),
-    )
+def _sorted_entries(directory: str) -> list[os.DirEntry[str]]:
+    # DirEntry caches the type reported by scandir, so sorting does not re-stat.
+    with os.scandir(directory) as entries:
+        return sorted(entries, key=lambda entry: (entry.is_file(), entry.name.lower()))
+
+
+def _build_tree(directory: str) -> list[dict[str, object]]:
+    """Build the ``list_tree`` payload iteratively.
+
+    Files carry ``size`` and directories carry ``children``, both beside name/path/type.
+    """
+    nodes: list[dict[str, object]] = []
+    pending: list[tuple[str, str, list[dict[str, object]]]] = [(directory, "", nodes)]
+    while pending:
+        current, prefix, siblings = pending.pop()
+        for entry in _sorted_entries(current):
+            rel_path = prefix + entry.name
+            if entry.is_dir():
+                children: list[dict[str, object]] = []
+                siblings.append(
+                    {"name": entry.name, "path": rel_path, "type": "directory", "children": children}
+                )
+                pending.append((entry.path, rel_path + "/", children))
+            else:
+                siblings.append(
+                    {"name": entry.name, "path": rel_path, "type": "file", "size": entry.stat().st_size}
+                )
+    return nodes
 
 
-def _tree_for_path(path: Path, root: Path) -> WorkspaceTreeNode:
-    rel_path = _relative_path(path, root)
-    if path.is_dir():
-        children = [_tree_for_path(child, root) for child in _sorted_entries(path)]
-        return WorkspaceTreeNode(
-            name=path.name,
-            path=rel_path,
-            type="directory",
-            children=children,
-        )
-    return WorkspaceTreeNode(
-        name=path.name,
-        path=rel_path,
-        type="file",
-        size=path.stat().st_size,
-    )
+def _iter_files(directory: Path, rel_prefix: str = "") -> Iterator[tuple[str, os.DirEntry[str]]]:
+    """Yield ``(relative_path, entry)`` for every file below ``directory``, in scan order.
+
+    Like ``Path.rglob``, symlinked directories are not descended into.
+    """
+    pending = [(str(directory), rel_prefix)]
+    while pending:
+        current, prefix = pending.pop()
+        with os.scandir(current) as entries:
+            for entry in entries:
+                rel = prefix + entry.name
+                if entry.is_dir(follow_symlinks=False):
+                    pending.append((entry.path, rel + "/"))
+                elif entry.is_file():
+                    yield rel, entry
+
+
+def _walk_files(directory: Path, rel_prefix: str = "") -> list[tuple[str, os.DirEntry[str]]]:
+    """Return ``(relative_path, entry)`` for every file below ``directory``, sorted by path."""
+    found = list(_iter_files(directory, rel_prefix))
+    found.sort(key=lambda item: item[0])
+    return found
 
 
 def list_tree(workspace_id: str | None = None) -> list[dict[str, object]]:
     root = workspace_root(workspace_id)
-    nodes = [_tree_for_path(path, root).to_dict() for path in _sorted_entries(root)]
-    return nodes
+    return _cached_listing(root, "tree", lambda: _build_tree(str(root)))
 
 
-def list_relative_files(directory: str = ".", workspace_id: str | None = None) -> list[str]:
+def list_relative_files(
+    directory: str = ".",
+    workspace_id: str | None = None,
+    *,
+    limit: int | None = None,
+) -> list[str]:
+    """Return sorted relative file paths; with ``limit``, only the first ``limit`` of them."""
     target = resolve_workspace_path(directory, allow_root=True, workspace_id=workspace_id)
     if not target.exists():
-        raise FileNotFoundError(f"{directory} does not exist.")
+        raise WorkspaceNotFoundError(f"{directory} does not exist.")
     if not target.is_dir():
         raise WorkspaceValidationError(f"{directory} is not a directory.")
 
     root = workspace_root(workspace_id)
-    files = [path.relative_to(root).as_posix() for path in target.rglob("*") if path.is_file()]
-    return sorted(files)
+    rel_prefix = "" if target == root else _relative_path(target, root) + "/"
+    if limit is not None:
+        return heapq.nsmallest(limit, (rel for rel, _ in _iter_files(target, rel_prefix)))
+    return [rel for rel, _ in _walk_files(target, rel_prefix)]
 
 
 def list_flat_text_files(
     workspace_id: str | None = None,
 ) -> tuple[dict[str, str], list[str]]:
     root = workspace_root(workspace_id)
+    return _cached_listing(root, "files", lambda: _read_flat_text_files(root))
+
+
+def iter_flat_text_files(workspace_id: str | None = None) -> Iterator[tuple[str, str | None]]:
+    """Return an iterator of ``(relative_path, text)`` pairs; ``text`` is None for binary files.
+
+    The workspace is resolved eagerly so validation errors surface before iteration.
+    """
+    return _iter_text_files(workspace_root(workspace_id))
+
+
+def _read_utf8(path: str | Path) -> str:
+    """Read and decode a UTF-8 file, translating newlines as text-mode reads do.
+
+    The first block is decoded before the rest is read, so binary files are usually
+    rejected with ``UnicodeDecodeError`` after reading only ``_TEXT_SNIFF_BYTES``.
+    """
+    decoder = _UTF8_DECODER()
+    with open(path, "rb") as handle:
+        text = decoder.decode(handle.read(_TEXT_SNIFF_BYTES))
+        text += decoder.decode(handle.read(), final=True)
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return text
+
+
+def _read_text_or_none(path: str) -> str | None:
+    try:
+        return _read_utf8(path)
+    except UnicodeDecodeError:
+        return None
+
+
+def _iter_text_files(root: Path) -> Iterator[tuple[str, str | None]]:
+    for rel, entry in _walk_files(root):
+        yield rel, _read_text_or_none(entry.path)
+
+
+def _read_pool() -> ThreadPoolExecutor:
+    global _READ_POOL
+    with _READ_POOL_LOCK:
+        if _READ_POOL is None:
+            _READ_POOL = ThreadPoolExecutor(
+                max_workers=FLAT_LISTING_READ_WORKERS,
+                thread_name_prefix="workspace-read",
+            )
+        return _READ_POOL
+
+
+def _read_flat_text_files(root: Path) -> tuple[dict[str, str], list[str]]:
     files: dict[str, str] = {}
     skipped_binary: list[str] = []
 
-    for path in sorted((item for item in root.rglob("*") if item.is_file()), key=lambda p: p.as_posix()):
-        rel = path.relative_to(root).as_posix()
-        try:
-            files[rel] = path.read_text(encoding="utf-8")
-        except UnicodeDecodeError:
+    walked = _walk_files(root)
+    paths = [entry.path for _, entry in walked]
+    if len(paths) < _PARALLEL_READ_MIN_FILES:
+        contents: Iterable[str | None] = map(_read_text_or_none, paths)
+    else:
+        # read() releases the GIL, so a few threads overlap cold-cache disk latency.
+        contents = _read_pool().map(_read_text_or_none, paths)
+
+    for (rel, _), content in zip(walked, contents):
+        if content is None:
             skipped_binary.append(rel)
+        else:
+            files[rel] = content
 
     return files, skipped_binary
 
@@ -335,13 +574,25 @@ def list_flat_text_files(
 def read_text_file(path: str, workspace_id: str | None = None) -> str:
     target = resolve_workspace_path(path, workspace_id=workspace_id)
     if not target.exists() or not target.is_file():
-        raise FileNotFoundError(f"{path} does not exist.")
+        raise WorkspaceNotFoundError(f"{path} does not exist.")
     try:
-        return target.read_text(encoding="utf-8")
+        return _read_utf8(target)
     except UnicodeDecodeError as exc:
         raise WorkspaceBinaryFileError(f"{path} is binary and cannot be edited as text.") from exc
 
 
+def text_file_etag(path: str, workspace_id: str | None = None) -> str:
+    """Return a weak ETag derived from the file's mtime and size, without reading it."""
+    target = resolve_workspace_path(path, workspace_id=workspace_id)
+    try:
+        info = target.stat()
+    except FileNotFoundError as exc:
+        raise WorkspaceNotFoundError(f"{path} does not exist.") from exc
+    if not stat.S_ISREG(info.st_mode):
+        raise WorkspaceNotFoundError(f"{path} does not exist.")
+    return f'W/"{info.st_mtime_ns}-{info.st_size}"'
+
+
 def write_text_file(path: str, content: str, workspace_id: str | None = None) -> str:
     if len(content) > MAX_EDITABLE_FILE_CHARS:
         raise WorkspaceValidationError(
@@ -351,7 +602,8 @@ def write_text_file(path: str, content: str, workspace_id: str | None = None) ->
     root = workspace_root(workspace_id)
     target = resolve_workspace_path(path, workspace_id=workspace_id)
     target.parent.mkdir(parents=True, exist_ok=True)
-    target.write_text(content, encoding="utf-8")
+    target.write_bytes(content.encode("utf-8"))
+    _invalidate_listings(root)
     return _relative_path(target, root)
 
 
@@ -359,16 +611,21 @@ def create_folder(path: str, workspace_id: str | None = None) -> str:
     root = workspace_root(workspace_id)
     target = resolve_workspace_path(path, workspace_id=workspace_id)
     target.mkdir(parents=True, exist_ok=True)
+    _invalidate_listings(root)
     return _relative_path(target, root)
 
 
 def delete_path(path: str, *, recursive: bool = False, workspace_id: str | None = None) -> str:
+    root = workspace_root(workspace_id)
     target = resolve_workspace_path(path, workspace_id=workspace_id)
-    if not target.exists():
-        raise FileNotFoundError(f"{path} does not exist.")
+    try:
+        info = os.lstat(target)
+    except FileNotFoundError as exc:
+        raise WorkspaceNotFoundError(f"{path} does not exist.") from exc
 
-    if target.is_dir():
-        has_children = any(target.iterdir())
+    if stat.S_ISDIR(info.st_mode):
+        with os.scandir(target) as entries:
+            has_children = next(entries, None) is not None
         if has_children and not recursive:
             raise WorkspaceConflictError(
                 f"{path} is a non-empty directory. Use recursive=true to delete."
@@ -376,9 +633,10 @@ def delete_path(path: str, *, recursive: bool = False, workspace_id: str | None
         if has_children:
             shutil.rmtree(target)
         else:
-            target.rmdir()
+            os.rmdir(target)
     else:
-        target.unlink()
+        os.unlink(target)
+    _invalidate_listings(root)
     return path.strip().replace("\\", "/")
 
 
@@ -394,25 +652,107 @@ def rename_path(
     target = resolve_workspace_path(to_path, workspace_id=workspace_id)
 
     if not source.exists():
-        raise FileNotFoundError(f"{from_path} does not exist.")
+        raise WorkspaceNotFoundError(f"{from_path} does not exist.")
+    if not overwrite and target.exists():
+        raise WorkspaceConflictError(f"{to_path} already exists.")
 
-    if target.exists():
-        if not overwrite:
-            raise WorkspaceConflictError(f"{to_path} already exists.")
+    target.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        # Atomically replaces an existing file (or empty directory) in a single syscall.
+        os.replace(source, target)
+    except OSError as exc:
+        if not isinstance(exc, (IsADirectoryError, NotADirectoryError)) and exc.errno not in (
+            errno.ENOTEMPTY,
+            errno.EEXIST,
+        ):
+            raise
+        # The target type differs from the source, or it is a non-empty directory.
         if target.is_dir():
             shutil.rmtree(target)
         else:
             target.unlink()
-
-    target.parent.mkdir(parents=True, exist_ok=True)
-    source.rename(target)
+        os.replace(source, target)
+    _invalidate_listings(root)
     return _relative_path(target, root)
 
 
-def build_workspace_zip(workspace_id: str | None = None) -> bytes:
-    root = workspace_root(workspace_id)
-    buffer = BytesIO()
-    with zipfile.ZipFile(buffer, mode="w", compression=zipfile.ZIP_DEFLATED) as archive:
-        for path in sorted((item for item in root.rglob("*") if item.is_file()), key=lambda p: p.as_posix()):
-            archive.write(path, arcname=path.relative_to(root).as_posix())
-    return buffer.getvalue()
+class _ZipChunkSink(RawIOBase):
+    """Unseekable write target that lets a ZipFile be drained chunk by chunk."""
+
+    def __init__(self) -> None:
+        self._chunks: list[bytes] = []
+        self._offset = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        chunk = bytes(data)
+        self._chunks.append(chunk)
+        self._offset += len(chunk)
+        return len(chunk)
+
+    def tell(self) -> int:
+        return self._offset
+
+    def drain(self) -> bytes:
+        payload = b"".join(self._chunks)
+        self._chunks.clear()
+        return payload
+
+
+def iter_workspace_zip(
+    workspace_id: str | None = None,
+    *,
+    compression: str = DEFAULT_ZIP_COMPRESSION,
+) -> Iterator[bytes]:
+    """Return an iterator over the workspace ZIP.
+
+    Output is yielded after every ``ZIP_STREAM_CHUNK_BYTES`` block read from a file,
+    so memory stays bounded by one block however large the files are.
+
+    The workspace and compression mode are validated eagerly so errors surface
+    to the caller before any bytes are streamed.
+    """
+    mode = ZIP_COMPRESSION_MODES.get(compression)
+    if mode is None:
+        raise WorkspaceValidationError(
+            f"compression must be one of {sorted(ZIP_COMPRESSION_MODES)}."
+        )
+    return _iter_zip_chunks(workspace_root(workspace_id), *mode)
+
+
+def _iter_zip_chunks(root: Path, compress_type: int, compress_level: int | None) -> Iterator[bytes]:
+    sink = _ZipChunkSink()
+    with zipfile.ZipFile(
+        sink,
+        mode="w",
+        compression=compress_type,
+        compresslevel=compress_level,
+    ) as archive:
+        for rel, entry in _walk_files(root):
+            info = zipfile.ZipInfo.from_file(entry.path, arcname=rel)
+            if os.path.splitext(entry.name)[1].lower() in _PRECOMPRESSED_SUFFIXES:
+                info.compress_type = zipfile.ZIP_STORED
+            else:
+                info.compress_type = compress_type
+                setattr(info, _ZIPINFO_LEVEL_ATTR, compress_level)
+            # Draining after every block keeps memory at one block even for large files.
+            with open(entry.path, "rb") as source, archive.open(info, mode="w") as target:
+                while chunk := source.read(ZIP_STREAM_CHUNK_BYTES):
+                    target.write(chunk)
+                    payload = sink.drain()
+                    if payload:
+                        yield payload
+    # Remaining headers, data descriptors and the central directory.
+    payload = sink.drain()
+    if payload:
+        yield payload
+
+
+def build_workspace_zip(
+    workspace_id: str | None = None,
+    *,
+    compression: str = DEFAULT_ZIP_COMPRESSION,
+) -> bytes:
+    return b"".join(iter_workspace_zip(workspace_id, compression=compression))
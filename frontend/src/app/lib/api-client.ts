@@ -17,6 +17,8 @@ export interface GraphSchemaEdge {
   target: string;
   animated: boolean;
   type: string;
+  label?: string;
+  data?: { conditional?: boolean };
 }
 
 export interface GraphSchemaResponse {
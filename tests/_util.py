@@ -0,0 +1,37 @@
+"""Shared fixtures for the workspace test modules."""
+
+from __future__ import annotations
+
+import atexit
+import itertools
+import os
+from pathlib import Path
+import shutil
+import tempfile
+
+
+# tmpfs keeps the many tiny fixture writes off the disk where it is available.
+_TMP_PARENT = "/dev/shm" if os.path.isdir("/dev/shm") else None
+# One root for the whole run, wiped once at exit instead of an rmtree per test.
+_SUITE_ROOT = Path(tempfile.mkdtemp(prefix="ws_suite_", dir=_TMP_PARENT)).resolve()
+atexit.register(shutil.rmtree, _SUITE_ROOT, ignore_errors=True)
+_ROOT_COUNTER = itertools.count()
+
+
+def new_workspace_root() -> Path:
+    """Create and return an empty, resolved ``generated_project`` directory for one test."""
+    root = _SUITE_ROOT / f"ws_{next(_ROOT_COUNTER)}" / "generated_project"
+    root.mkdir(parents=True)
+    return root
+
+
+def seed_files(root: Path, files: dict[str, str]) -> None:
+    """Write ``files`` (relative path -> text) under ``root``, creating parent folders."""
+    for relative_path, content in files.items():
+        target = os.path.join(root, relative_path)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        fd = os.open(target, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            os.write(fd, content.encode("utf-8"))
+        finally:
+            os.close(fd)
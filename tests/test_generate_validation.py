@@ -9,13 +9,16 @@ import agent.api as api_module
 from agent.api import app
 from agent.prompts import MAX_MUTABLE_PROMPT_CHARS
 
+_OVERSIZED_PROMPT = "x" * (MAX_MUTABLE_PROMPT_CHARS + 1)
+
 
 class GenerateValidationTests(unittest.TestCase):
-    def setUp(self) -> None:
-        self.client = TestClient(app)
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.client = TestClient(app)
 
     def test_oversized_prompt_override_returns_422(self) -> None:
-        oversized = "x" * (MAX_MUTABLE_PROMPT_CHARS + 1)
+        oversized = _OVERSIZED_PROMPT
         payload = {
             "user_prompt": "Build a todo app",
             "api_key": "test-key",
@@ -23,7 +26,7 @@ class GenerateValidationTests(unittest.TestCase):
         }
 
         with patch("agent.api.build_chat_model") as mock_build, patch(
-            "agent.api.run_workflow"
+            "agent.api.arun_workflow"
         ) as mock_run:
             response = self.client.post("/generate", json=payload)
 
@@ -33,7 +36,7 @@ class GenerateValidationTests(unittest.TestCase):
         mock_run.assert_not_called()
 
     def test_oversized_legacy_mutable_prompt_returns_422(self) -> None:
-        oversized = "x" * (MAX_MUTABLE_PROMPT_CHARS + 1)
+        oversized = _OVERSIZED_PROMPT
         payload = {
             "user_prompt": "Build a todo app",
             "api_key": "test-key",
@@ -41,7 +44,7 @@ class GenerateValidationTests(unittest.TestCase):
         }
 
         with patch("agent.api.build_chat_model") as mock_build, patch(
-            "agent.api.run_workflow"
+            "agent.api.arun_workflow"
         ) as mock_run:
             response = self.client.post("/generate", json=payload)
 
@@ -58,7 +61,7 @@ class GenerateValidationTests(unittest.TestCase):
         }
 
         with patch("agent.api.build_chat_model") as mock_build, patch(
-            "agent.api.run_workflow"
+            "agent.api.arun_workflow"
         ) as mock_run:
             response = self.client.post("/generate", json=payload)
 
@@ -81,7 +84,7 @@ class GenerateValidationTests(unittest.TestCase):
         }
 
         with patch("agent.api.build_chat_model") as mock_build, patch(
-            "agent.api.run_workflow"
+            "agent.api.arun_workflow"
         ) as mock_run:
             mock_build.return_value = object()
             mock_run.return_value = {"status": "DONE", "plan": None, "detailed_ins": None}
@@ -104,7 +107,7 @@ class GenerateValidationTests(unittest.TestCase):
         headers = {"X-API-KEY": "header-key"}
 
         with patch("agent.api.build_chat_model") as mock_build, patch(
-            "agent.api.run_workflow"
+            "agent.api.arun_workflow"
         ) as mock_run:
             mock_build.return_value = object()
             mock_run.return_value = {"status": "DONE", "plan": None, "detailed_ins": None}
@@ -119,7 +122,7 @@ class GenerateValidationTests(unittest.TestCase):
         payload = {"user_prompt": "Build a todo app"}
 
         with patch("agent.api.build_chat_model") as mock_build, patch(
-            "agent.api.run_workflow"
+            "agent.api.arun_workflow"
         ) as mock_run:
             response = self.client.post("/generate", json=payload)
 
@@ -137,7 +140,7 @@ class GenerateValidationTests(unittest.TestCase):
         with patch.object(api_module.SECURITY_CONFIG, "expose_verbose_errors", False), patch(
             "agent.api.build_chat_model"
         ) as mock_build, patch(
-            "agent.api.run_workflow",
+            "agent.api.arun_workflow",
             side_effect=RuntimeError("sensitive-debug-message"),
         ):
             mock_build.return_value = object()
@@ -162,7 +165,7 @@ class GenerateValidationTests(unittest.TestCase):
         with patch.object(api_module.SECURITY_CONFIG, "expose_verbose_errors", False), patch(
             "agent.api.build_chat_model"
         ) as mock_build, patch(
-            "agent.api.run_workflow",
+            "agent.api.arun_workflow",
             side_effect=RuntimeError("connection refused by upstream"),
         ):
             mock_build.return_value = object()
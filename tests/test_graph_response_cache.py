@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import unittest
+from unittest.mock import patch
+
+from agent.graph import (
+    _StructuredResponseCache,
+    _architect_agent,
+    _bind_run,
+    _normalize_prompt_for_cache,
+    _planner_agent,
+    _response_cache_key,
+)
+from agent.state import FileSpec, ImplementationStep, Plan, TaskPlan
+
+
+class _FakeModel:
+    def __init__(self, model_name: str, groq_api_key: str | None = None) -> None:
+        self.model_name = model_name
+        self.groq_api_key = groq_api_key
+
+
+class _FakeStructuredModel(_FakeModel):
+    """Stands in for a chat model; every structured call returns ``response``."""
+
+    def __init__(self, response: Plan | TaskPlan, groq_api_key: str = "key-a") -> None:
+        super().__init__("m1", groq_api_key)
+        self.response = response
+        self.calls = 0
+
+    def with_structured_output(self, _schema: type) -> "_FakeStructuredModel":
+        return self
+
+    def invoke(self, _prompt: str) -> Plan | TaskPlan:
+        self.calls += 1
+        return self.response.model_copy(deep=True)
+
+
+_PLAN = Plan(
+    name="Todo",
+    description="A todo app. It stores tasks.",
+    techstack="python",
+    features=["add task"],
+    files=[FileSpec(path="main.py", purpose="entry point")],
+)
+_TASK_PLAN = TaskPlan(
+    implementation_steps=[ImplementationStep(file_path="main.py", task_description="write it")]
+)
+
+
+class StructuredResponseCacheTests(unittest.TestCase):
+    def test_least_recently_used_entry_is_evicted(self) -> None:
+        cache = _StructuredResponseCache(max_entries=2)
+        cache.put("a", "1")
+        cache.put("b", "2")
+        self.assertEqual(cache.get("a"), "1")
+
+        cache.put("c", "3")
+
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), "1")
+        self.assertEqual(cache.get("c"), "3")
+
+    def test_zero_size_disables_storage(self) -> None:
+        cache = _StructuredResponseCache(max_entries=0)
+        cache.put("a", "1")
+        self.assertIsNone(cache.get("a"))
+
+    def test_key_depends_on_model_and_prompt(self) -> None:
+        base = _response_cache_key(_FakeModel("m1"), Plan, "prompt")
+
+        self.assertEqual(base, _response_cache_key(_FakeModel("m1"), Plan, "prompt"))
+        self.assertNotEqual(base, _response_cache_key(_FakeModel("m2"), Plan, "prompt"))
+        self.assertNotEqual(base, _response_cache_key(_FakeModel("m1"), Plan, "other prompt"))
+        self.assertNotEqual(base, _response_cache_key(_FakeModel("m1", "key-b"), Plan, "prompt"))
+
+    def test_planner_normalization_only_strips_surrounding_whitespace(self) -> None:
+        self.assertEqual(
+            _normalize_prompt_for_cache("  Build Main.java\n"),
+            _normalize_prompt_for_cache("Build Main.java"),
+        )
+        self.assertNotEqual(
+            _normalize_prompt_for_cache("Build Main.java"),
+            _normalize_prompt_for_cache("Build main.java"),
+        )
+        self.assertNotEqual(
+            _normalize_prompt_for_cache("```\nif x:\n    y()\n```"),
+            _normalize_prompt_for_cache("```\nif x:\n  y()\n```"),
+        )
+
+
+class NodeResponseCacheTests(unittest.TestCase):
+    def _run_planner(self, llm: _FakeStructuredModel) -> dict[str, object]:
+        with _bind_run(llm, None):
+            return _planner_agent().invoke({"user_prompt": "Build a todo app"})
+
+    def test_planner_calls_model_every_run_by_default(self) -> None:
+        llm = _FakeStructuredModel(_PLAN)
+        with patch("agent.graph._RESPONSE_CACHE", _StructuredResponseCache(max_entries=0)):
+            self._run_planner(llm)
+            self._run_planner(llm)
+
+        self.assertEqual(llm.calls, 2)
+
+    def test_planner_cache_hit_is_scoped_to_credential(self) -> None:
+        owner = _FakeStructuredModel(_PLAN, groq_api_key="key-a")
+        other = _FakeStructuredModel(_PLAN, groq_api_key="key-b")
+        with patch("agent.graph._RESPONSE_CACHE", _StructuredResponseCache(max_entries=8)):
+            first = self._run_planner(owner)
+            second = self._run_planner(owner)
+            self._run_planner(other)
+
+        self.assertEqual(owner.calls, 1)
+        self.assertEqual(second["plan"], first["plan"])
+        self.assertEqual(other.calls, 1)
+
+    def test_architect_cache_hit_skips_model(self) -> None:
+        llm = _FakeStructuredModel(_TASK_PLAN)
+        with patch("agent.graph._RESPONSE_CACHE", _StructuredResponseCache(max_entries=8)):
+            with _bind_run(llm, None):
+                first = _architect_agent().invoke({"plan": _PLAN})
+                second = _architect_agent().invoke({"plan": _PLAN})
+
+        self.assertEqual(llm.calls, 1)
+        self.assertEqual(second["detailed_ins"], first["detailed_ins"])
+
+
+if __name__ == "__main__":
+    unittest.main()
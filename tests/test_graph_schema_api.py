@@ -8,8 +8,9 @@ from agent.api import app
 
 
 class GraphSchemaApiTests(unittest.TestCase):
-    def setUp(self) -> None:
-        self.client = TestClient(app)
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.client = TestClient(app)
 
     def test_graph_schema_shape(self) -> None:
         response = self.client.get("/graph/schema")
@@ -23,12 +24,17 @@ class GraphSchemaApiTests(unittest.TestCase):
         self.assertIn("activity_model", payload)
 
         node_ids = {node["id"] for node in payload["nodes"]}
-        self.assertEqual(node_ids, {"planner", "architect", "coder"})
+        self.assertEqual(node_ids, {"planner", "architect", "coder", "end"})
 
-        edges = {(edge["source"], edge["target"]) for edge in payload["edges"]}
+        edges = {(edge["source"], edge["target"]): edge for edge in payload["edges"]}
         self.assertIn(("planner", "architect"), edges)
         self.assertIn(("architect", "coder"), edges)
+        self.assertIn(("architect", "end"), edges)
         self.assertIn(("coder", "coder"), edges)
+        self.assertIn(("coder", "end"), edges)
+        self.assertNotIn("data", edges[("planner", "architect")])
+        for conditional in (("architect", "coder"), ("architect", "end")):
+            self.assertTrue(edges[conditional]["data"]["conditional"])
 
     def test_graph_schema_models(self) -> None:
         response = self.client.get("/graph/schema")
@@ -38,6 +44,14 @@ class GraphSchemaApiTests(unittest.TestCase):
         self.assertEqual(payload["activity_model"]["min"], 0.0)
         self.assertEqual(payload["activity_model"]["max"], 1.0)
 
+    def test_graph_schema_honors_if_none_match(self) -> None:
+        etag = self.client.get("/graph/schema").headers["ETag"]
+
+        response = self.client.get("/graph/schema", headers={"If-None-Match": etag})
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -8,8 +8,9 @@ from agent.api import app
 
 
 class PromptSchemaApiTests(unittest.TestCase):
-    def setUp(self) -> None:
-        self.client = TestClient(app)
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.client = TestClient(app)
 
     def test_schema_endpoints_return_same_payload(self) -> None:
         response_api = self.client.get("/api/prompts")
@@ -11,6 +11,8 @@ from agent.prompts import (
     prompt_schema,
 )
 
+_OVERSIZED_PROMPT = "x" * (MAX_MUTABLE_PROMPT_CHARS + 1)
+
 
 class PromptCompositionTests(unittest.TestCase):
     def test_composed_prompt_order(self) -> None:
@@ -46,7 +48,7 @@ class PromptCompositionTests(unittest.TestCase):
             self.assertNotIn("suffix", schema["nodes"][node])
 
     def test_mutable_layer_over_limit_is_rejected(self) -> None:
-        oversized = "x" * (MAX_MUTABLE_PROMPT_CHARS + 1)
+        oversized = _OVERSIZED_PROMPT
         with self.assertRaises(ValueError):
             get_composed_prompt("planner", oversized, "Context")
 
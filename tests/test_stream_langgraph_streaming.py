@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import asyncio
 import json
 import unittest
 from unittest.mock import patch
@@ -13,26 +14,17 @@ from agent.graph import astream_workflow
 
 def _parse_sse_events(body: str) -> list[dict[str, object]]:
     events: list[dict[str, object]] = []
-    current: dict[str, object] = {}
 
-    for line in body.splitlines():
-        if line.startswith("event: "):
-            if current:
-                events.append(current)
-                current = {}
-            current["event"] = line[len("event: ") :]
-            continue
-
-        if line.startswith("data: "):
-            current["data"] = json.loads(line[len("data: ") :])
-            continue
-
-        if not line.strip() and current:
-            events.append(current)
-            current = {}
-
-    if current:
-        events.append(current)
+    # Frames are separated by a blank line; keep-alive comment frames carry no fields.
+    for frame in body.split("\n\n"):
+        event: dict[str, object] = {}
+        for line in frame.split("\n"):
+            if line.startswith("event: "):
+                event["event"] = line[len("event: ") :]
+            elif line.startswith("data: "):
+                event["data"] = json.loads(line[len("data: ") :])
+        if event:
+            events.append(event)
 
     return events
 
@@ -76,20 +68,105 @@ class GraphAstreamWorkflowTests(unittest.IsolatedAsyncioTestCase):
         self.assertEqual(call_args[1], {"recursion_limit": 77})
 
 
+class SseBatchDrainTests(unittest.IsolatedAsyncioTestCase):
+    @staticmethod
+    async def _collect(queue: asyncio.Queue[object], **kwargs) -> list[bytes]:
+        return [chunk async for chunk in api_module._drain_sse_batches(queue, **kwargs)]
+
+    async def test_keepalive_is_emitted_after_idle_interval(self) -> None:
+        queue: asyncio.Queue[object] = asyncio.Queue()
+        batches = api_module._drain_sse_batches(queue, window_seconds=0, keepalive_seconds=0.01)
+
+        self.assertEqual(await batches.__anext__(), api_module._SSE_KEEPALIVE_FRAME)
+        queue.put_nowait(b"a")
+        queue.put_nowait(api_module._SSE_STREAM_DONE)
+        self.assertEqual([chunk async for chunk in batches], [b"a"])
+
+    async def test_batches_are_capped_at_sixteen_frames(self) -> None:
+        queue: asyncio.Queue[object] = asyncio.Queue()
+        for index in range(20):
+            queue.put_nowait(b"%d," % index)
+        queue.put_nowait(api_module._SSE_STREAM_DONE)
+
+        batches = await self._collect(queue, window_seconds=0)
+
+        self.assertEqual(len(batches), 2)
+        self.assertEqual(batches[0].count(b","), api_module._SSE_BATCH_MAX_EVENTS)
+        self.assertEqual(batches[1].count(b","), 4)
+
+    async def test_flush_window_joins_frames_that_arrive_during_it(self) -> None:
+        queue: asyncio.Queue[object] = asyncio.Queue()
+        queue.put_nowait(b"a")
+
+        async def late_producer() -> None:
+            await asyncio.sleep(0)
+            queue.put_nowait(b"b")
+            queue.put_nowait(api_module._SSE_STREAM_DONE)
+
+        producer = asyncio.create_task(late_producer())
+        batches = await self._collect(queue, window_seconds=0.05)
+        await producer
+
+        self.assertEqual(batches, [b"ab"])
+
+    async def test_done_sentinel_ends_stream(self) -> None:
+        queue: asyncio.Queue[object] = asyncio.Queue()
+        queue.put_nowait(b"a")
+        queue.put_nowait(api_module._SSE_STREAM_DONE)
+        queue.put_nowait(b"late")
+
+        self.assertEqual(await self._collect(queue, window_seconds=0), [b"a"])
+
+
+class StreamDisconnectTests(unittest.IsolatedAsyncioTestCase):
+    async def test_producer_finishes_when_client_disconnects_with_full_queue(self) -> None:
+        producer_tasks: list[asyncio.Task[object]] = []
+
+        async def fake_astream(*_args, **_kwargs):
+            producer_tasks.append(asyncio.current_task())
+            while True:
+                yield ("messages", ("tok", {"provider": "groq"}))
+
+        request = api_module.RunWorkflowRequest(user_prompt="Build a todo app", api_key="test-key")
+        with (
+            patch("agent.api.build_chat_model", return_value=object()),
+            patch("agent.api.astream_workflow", new=fake_astream),
+        ):
+            response = await api_module.stream_agent_workflow(
+                request,
+                flush_ms=0,
+                include_raw=False,
+                x_api_key=None,
+                x_workspace_id=None,
+            )
+            body = response.body_iterator
+            await body.__anext__()  # run_started
+            await body.__anext__()  # first batch; the producer now fills the queue
+            for _ in range(3):
+                await asyncio.sleep(0)
+            await asyncio.wait_for(body.aclose(), timeout=1)
+
+        self.assertEqual(len(producer_tasks), 1)
+        self.assertTrue(producer_tasks[0].done())
+
+
 class StreamEndpointTests(unittest.TestCase):
-    def setUp(self) -> None:
-        self.client = TestClient(app)
-        self.payload = {"user_prompt": "Build a todo app", "api_key": "test-key"}
+    payload = {"user_prompt": "Build a todo app", "api_key": "test-key"}
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.client = TestClient(app)
+        # Every stream test uses a dummy model, so the factory is patched once per class.
+        build_patcher = patch("agent.api.build_chat_model", return_value=object())
+        build_patcher.start()
+        cls.addClassCleanup(build_patcher.stop)
 
     def test_stream_emits_run_started_and_run_complete(self) -> None:
         async def fake_astream(*_args, **_kwargs):
             if False:
                 yield None
 
-        with patch("agent.api.build_chat_model", return_value=object()), patch(
-            "agent.api.astream_workflow",
-            new=fake_astream,
-        ):
+        with patch("agent.api.astream_workflow", new=fake_astream):
             response = self.client.post("/stream", json=self.payload)
 
         self.assertEqual(response.status_code, 200)
@@ -105,14 +182,28 @@ class StreamEndpointTests(unittest.TestCase):
         self.assertEqual(events[0]["data"]["message"], "Workflow run started with verbose stream modes: debug/messages/updates.")
         self.assertEqual(events[-1]["data"]["message"], "Workflow finished successfully.")
 
+    def test_stream_accepts_flush_ms_within_bounds(self) -> None:
+        async def fake_astream(*_args, **_kwargs):
+            yield ("messages", ("hello", {"provider": "groq"}))
+
+        with patch("agent.api.astream_workflow", new=fake_astream):
+            response = self.client.post("/stream", params={"flush_ms": 0}, json=self.payload)
+            rejected = self.client.post(
+                "/stream",
+                params={"flush_ms": api_module._SSE_BATCH_WINDOW_MAX_MS + 1},
+                json=self.payload,
+            )
+
+        self.assertEqual(response.status_code, 200)
+        events = _parse_sse_events(response.text)
+        self.assertEqual(events[-1]["event"], "run_complete")
+        self.assertEqual(rejected.status_code, 422)
+
     def test_stream_emits_on_chat_model_stream(self) -> None:
         async def fake_astream(*_args, **_kwargs):
             yield ("messages", ("hello", {"provider": "groq"}))
 
-        with patch("agent.api.build_chat_model", return_value=object()), patch(
-            "agent.api.astream_workflow",
-            new=fake_astream,
-        ):
+        with patch("agent.api.astream_workflow", new=fake_astream):
             response = self.client.post("/stream", json=self.payload)
 
         self.assertEqual(response.status_code, 200)
@@ -130,10 +221,7 @@ class StreamEndpointTests(unittest.TestCase):
         async def fake_astream(*_args, **_kwargs):
             yield (("parent:task",), "updates", {"planner": {"ok": True}, "architect": {"ok": True}})
 
-        with patch("agent.api.build_chat_model", return_value=object()), patch(
-            "agent.api.astream_workflow",
-            new=fake_astream,
-        ):
+        with patch("agent.api.astream_workflow", new=fake_astream):
             response = self.client.post("/stream", json=self.payload)
 
         self.assertEqual(response.status_code, 200)
@@ -153,10 +241,7 @@ class StreamEndpointTests(unittest.TestCase):
             yield ("debug", {"node": "planner", "message": "first"})
             yield ("debug", {"node": "planner", "message": "second"})
 
-        with patch("agent.api.build_chat_model", return_value=object()), patch(
-            "agent.api.astream_workflow",
-            new=fake_astream,
-        ):
+        with patch("agent.api.astream_workflow", new=fake_astream):
             response = self.client.post("/stream", json=self.payload)
 
         self.assertEqual(response.status_code, 200)
@@ -176,10 +261,7 @@ class StreamEndpointTests(unittest.TestCase):
             if False:
                 yield None
 
-        with patch("agent.api.build_chat_model", return_value=object()), patch(
-            "agent.api.astream_workflow",
-            new=fake_astream,
-        ):
+        with patch("agent.api.astream_workflow", new=fake_astream):
             response = self.client.post("/stream", json=self.payload)
 
         self.assertEqual(response.status_code, 200)
@@ -196,10 +278,7 @@ class StreamEndpointTests(unittest.TestCase):
             if False:
                 yield None
 
-        with patch("agent.api.build_chat_model", return_value=object()), patch(
-            "agent.api.astream_workflow",
-            new=fake_astream,
-        ):
+        with patch("agent.api.astream_workflow", new=fake_astream):
             response = self.client.post(
                 "/stream",
                 json={**self.payload, "workspace_id": "test_session_1"},
@@ -219,10 +298,7 @@ class StreamEndpointTests(unittest.TestCase):
             yield ("debug", {"type": "task", "payload": {"name": "coder"}})
             yield ("updates", {"coder": {"status": "DONE"}})
 
-        with patch("agent.api.build_chat_model", return_value=object()), patch(
-            "agent.api.astream_workflow",
-            new=fake_astream,
-        ):
+        with patch("agent.api.astream_workflow", new=fake_astream):
             response = self.client.post("/stream", json=self.payload)
 
         self.assertEqual(response.status_code, 200)
@@ -245,10 +321,7 @@ class StreamEndpointTests(unittest.TestCase):
             yield ("updates", {"planner": {"ok": True}})
             yield ("debug", {"type": "task_result", "payload": {"name": "planner"}})
 
-        with patch("agent.api.build_chat_model", return_value=object()), patch(
-            "agent.api.astream_workflow",
-            new=fake_astream,
-        ):
+        with patch("agent.api.astream_workflow", new=fake_astream):
             response = self.client.post("/stream", json=self.payload)
 
         self.assertEqual(response.status_code, 200)
@@ -266,10 +339,7 @@ class StreamEndpointTests(unittest.TestCase):
             if False:
                 yield None
 
-        with patch("agent.api.build_chat_model", return_value=object()), patch(
-            "agent.api.astream_workflow",
-            new=fake_astream,
-        ):
+        with patch("agent.api.astream_workflow", new=fake_astream):
             response = self.client.post("/stream", json=self.payload)
 
         self.assertEqual(response.status_code, 200)
@@ -285,9 +355,6 @@ class StreamEndpointTests(unittest.TestCase):
                 yield None
 
         with patch.object(api_module.SECURITY_CONFIG, "expose_verbose_errors", False), patch(
-            "agent.api.build_chat_model",
-            return_value=object(),
-        ), patch(
             "agent.api.astream_workflow",
             new=fake_astream,
         ):
@@ -309,10 +376,7 @@ class StreamEndpointTests(unittest.TestCase):
             yield ("messages", ("x", {"provider": "groq"}))
             yield ("updates", {"planner": {"ok": True}})
 
-        with patch("agent.api.build_chat_model", return_value=object()), patch(
-            "agent.api.astream_workflow",
-            new=fake_astream,
-        ):
+        with patch("agent.api.astream_workflow", new=fake_astream):
             response = self.client.post("/stream", json=self.payload)
 
         events = _parse_sse_events(response.text)
@@ -324,10 +388,7 @@ class StreamEndpointTests(unittest.TestCase):
             yield ("debug", {"node": "planner"})
             yield ("updates", {"planner": {"ok": True}})
 
-        with patch("agent.api.build_chat_model", return_value=object()), patch(
-            "agent.api.astream_workflow",
-            new=fake_astream,
-        ):
+        with patch("agent.api.astream_workflow", new=fake_astream):
             response = self.client.post("/stream", json=self.payload)
 
         events = _parse_sse_events(response.text)
@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+import unittest
+from unittest.mock import patch
+
+from agent.tools import LIST_FILES_LIMIT, list_files
+from tests._util import new_workspace_root, seed_files
+
+
+class ListFilesToolTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.root = new_workspace_root()
+        root_patch = patch("agent.workspace.WORKSPACE_ROOT", self.root)
+        root_patch.start()
+        self.addCleanup(root_patch.stop)
+        seed_files(self.root, {"a.txt": "a", "b.txt": "b", "src/c.py": "c"})
+
+    def test_zero_and_negative_limits_are_clamped_to_one(self) -> None:
+        for limit in (0, -2):
+            with self.subTest(limit=limit):
+                output = list_files.invoke({"directory": ".", "limit": limit})
+                self.assertEqual(output, "a.txt\n... (truncated to 1 files)")
+
+    def test_limit_above_cap_is_clamped(self) -> None:
+        with patch("agent.tools.list_relative_files", return_value=[]) as mock_list:
+            list_files.invoke({"directory": ".", "limit": LIST_FILES_LIMIT * 10})
+
+        self.assertEqual(mock_list.call_args.kwargs["limit"], LIST_FILES_LIMIT + 1)
+
+    def test_listing_within_limit_is_not_truncated(self) -> None:
+        output = list_files.invoke({"directory": "."})
+        self.assertEqual(output, "a.txt\nb.txt\nsrc/c.py")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,26 +1,22 @@
 from __future__ import annotations
 
 import io
-from pathlib import Path
+import os
 import shutil
 import unittest
 from unittest.mock import patch
-from uuid import uuid4
 import zipfile
 
 from agent import workspace
+from tests._util import new_workspace_root
 
 
 class WorkspaceServiceTests(unittest.TestCase):
     def setUp(self) -> None:
-        self.root = (Path.cwd() / "tests" / ".tmp" / f"ws_{uuid4().hex}" / "generated_project").resolve()
-        self.root.mkdir(parents=True, exist_ok=True)
-        self._patch = patch("agent.workspace.WORKSPACE_ROOT", self.root)
-        self._patch.start()
-
-    def tearDown(self) -> None:
-        self._patch.stop()
-        shutil.rmtree(self.root.parent, ignore_errors=True)
+        self.root = new_workspace_root()
+        root_patch = patch("agent.workspace.WORKSPACE_ROOT", self.root)
+        root_patch.start()
+        self.addCleanup(root_patch.stop)
 
     def test_traversal_is_rejected(self) -> None:
         with self.assertRaises(workspace.WorkspaceValidationError):
@@ -43,6 +39,48 @@ class WorkspaceServiceTests(unittest.TestCase):
         self.assertEqual(sorted(files.keys()), ["a.txt", "src/main.py"])
         self.assertEqual(skipped_binary, [])
 
+    def test_list_relative_files_limit_keeps_sorted_prefix(self) -> None:
+        for name in ("c.txt", "a.txt", "src/b.py", "b.txt"):
+            workspace.write_text_file(name, "x")
+
+        self.assertEqual(workspace.list_relative_files(limit=2), ["a.txt", "b.txt"])
+        self.assertEqual(len(workspace.list_relative_files(limit=10)), 4)
+
+    def test_listing_cache_is_invalidated_by_mutations(self) -> None:
+        workspace.write_text_file("a.txt", "a")
+        files, _ = workspace.list_flat_text_files()
+        self.assertEqual(sorted(files.keys()), ["a.txt"])
+
+        workspace.write_text_file("b.txt", "b")
+        workspace.rename_path("a.txt", "c.txt")
+        files, _ = workspace.list_flat_text_files()
+        self.assertEqual(sorted(files.keys()), ["b.txt", "c.txt"])
+
+        workspace.delete_path("b.txt")
+        top_level_paths = [node["path"] for node in workspace.list_tree()]
+        self.assertEqual(top_level_paths, ["c.txt"])
+
+    def test_delete_session_forgets_listing_cache(self) -> None:
+        workspace.write_text_file("a.txt", "a")
+        workspace.list_flat_text_files()
+        key = str(self.root)
+        self.assertIn(key, workspace._LISTING_GENERATIONS)
+        self.assertIn((key, "files"), workspace._LISTING_CACHE)
+
+        workspace.delete_session(workspace.DEFAULT_WORKSPACE_ID)
+
+        self.assertNotIn(key, workspace._LISTING_GENERATIONS)
+        self.assertNotIn((key, "files"), workspace._LISTING_CACHE)
+
+    def test_expired_listings_are_evicted(self) -> None:
+        workspace.write_text_file("a.txt", "a")
+        key = str(self.root)
+        with patch("agent.workspace.LISTING_CACHE_TTL_SECONDS", 0):
+            workspace.list_tree()
+            workspace.list_flat_text_files()
+
+        self.assertNotIn((key, "tree"), workspace._LISTING_CACHE)
+
     def test_rename_conflict_without_overwrite(self) -> None:
         workspace.write_text_file("a.txt", "a")
         workspace.write_text_file("b.txt", "b")
@@ -50,6 +88,36 @@ class WorkspaceServiceTests(unittest.TestCase):
         with self.assertRaises(workspace.WorkspaceConflictError):
             workspace.rename_path("a.txt", "b.txt", overwrite=False)
 
+    def test_rename_overwrite_replaces_existing_file(self) -> None:
+        workspace.write_text_file("a.txt", "a")
+        workspace.write_text_file("b.txt", "b")
+
+        renamed = workspace.rename_path("a.txt", "b.txt", overwrite=True)
+
+        self.assertEqual(renamed, "b.txt")
+        self.assertFalse((self.root / "a.txt").exists())
+        self.assertEqual(workspace.read_text_file("b.txt"), "a")
+
+    def test_rename_file_over_directory_with_overwrite(self) -> None:
+        workspace.write_text_file("a.txt", "a")
+        workspace.write_text_file("target/inner.txt", "x")
+
+        renamed = workspace.rename_path("a.txt", "target", overwrite=True)
+
+        self.assertEqual(renamed, "target")
+        self.assertTrue((self.root / "target").is_file())
+        self.assertEqual(workspace.read_text_file("target"), "a")
+
+    def test_rename_directory_over_non_empty_directory_with_overwrite(self) -> None:
+        workspace.write_text_file("src/new.py", "new")
+        workspace.write_text_file("dst/old.py", "old")
+
+        renamed = workspace.rename_path("src", "dst", overwrite=True)
+
+        self.assertEqual(renamed, "dst")
+        self.assertFalse((self.root / "src").exists())
+        self.assertEqual(sorted(workspace.list_relative_files()), ["dst/new.py"])
+
     def test_delete_directory_requires_recursive(self) -> None:
         workspace.write_text_file("src/a.py", "x")
 
@@ -62,16 +130,65 @@ class WorkspaceServiceTests(unittest.TestCase):
         self.assertEqual(deleted, "src")
         mock_rmtree.assert_called_once()
 
+    def test_workspace_context_reuses_bound_session_root(self) -> None:
+        with workspace.workspace_context(None):
+            with patch("agent.workspace.ensure_session", wraps=workspace.ensure_session) as mock_ensure:
+                self.assertEqual(workspace.workspace_root(), self.root)
+                mock_ensure.assert_not_called()
+
+                workspace.delete_session(workspace.DEFAULT_WORKSPACE_ID)
+                self.assertEqual(workspace.workspace_root(), self.root)
+                mock_ensure.assert_called_once()
+
+    def test_workspace_context_binds_resolved_session_without_ensuring(self) -> None:
+        session = workspace.ensure_session(None)
+        with patch("agent.workspace.ensure_session", wraps=workspace.ensure_session) as mock_ensure:
+            with workspace.workspace_context(session.workspace_id, session=session) as bound_id:
+                self.assertEqual(bound_id, workspace.DEFAULT_WORKSPACE_ID)
+                self.assertEqual(workspace.workspace_root(), self.root)
+            mock_ensure.assert_not_called()
+
+    def test_workspace_context_rechecks_removed_session_root(self) -> None:
+        with workspace.workspace_context(None):
+            shutil.rmtree(self.root)
+            with patch("agent.workspace.ensure_session", wraps=workspace.ensure_session) as mock_ensure:
+                self.assertEqual(workspace.workspace_root(), self.root)
+                mock_ensure.assert_called_once()
+            self.assertTrue(self.root.is_dir())
+
     def test_zip_contains_workspace_files(self) -> None:
         workspace.write_text_file("README.md", "hello")
         workspace.write_text_file("src/main.py", "print('zip')")
 
         archive_bytes = workspace.build_workspace_zip()
-        archive = zipfile.ZipFile(io.BytesIO(archive_bytes))
 
-        names = sorted(archive.namelist())
-        self.assertEqual(names, ["README.md", "src/main.py"])
-        self.assertEqual(archive.read("README.md").decode("utf-8"), "hello")
+        with zipfile.ZipFile(io.BytesIO(archive_bytes)) as archive:
+            infos = {info.filename: info for info in archive.infolist()}
+            self.assertEqual(sorted(infos), ["README.md", "src/main.py"])
+            self.assertEqual(archive.read(infos["README.md"]), b"hello")
+
+    def test_zip_streams_large_file_in_blocks(self) -> None:
+        with open(self.root / "blob.png", "wb") as handle:
+            handle.write(os.urandom(workspace.ZIP_STREAM_CHUNK_BYTES * 3))
+
+        chunks = list(workspace.iter_workspace_zip())
+
+        self.assertGreater(len(chunks), 3)
+        self.assertLess(max(len(chunk) for chunk in chunks), workspace.ZIP_STREAM_CHUNK_BYTES * 2)
+        with zipfile.ZipFile(io.BytesIO(b"".join(chunks))) as archive:
+            self.assertIsNone(archive.testzip())
+
+    def test_zip_stores_precompressed_entries(self) -> None:
+        workspace.write_text_file("src/main.py", "print('zip')\n" * 50)
+        (self.root / "logo.png").write_bytes(b"\x89PNG" + bytes(range(64)))
+
+        archive_bytes = workspace.build_workspace_zip()
+
+        with zipfile.ZipFile(io.BytesIO(archive_bytes)) as archive:
+            infos = {info.filename: info for info in archive.infolist()}
+            self.assertEqual(infos["logo.png"].compress_type, zipfile.ZIP_STORED)
+            self.assertEqual(infos["src/main.py"].compress_type, zipfile.ZIP_DEFLATED)
+            self.assertIsNone(archive.testzip())
 
 
 if __name__ == "__main__":